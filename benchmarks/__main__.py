@@ -0,0 +1,90 @@
+from . import suite
+import subprocess
+import platform
+import argparse
+import logging as log
+import json
+import time
+import sys
+import os
+
+
+# default baseline, rewritten with --save-baseline
+_baseline = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'baseline.json')
+
+
+def commit():
+    '''Returns the checked out commit, None outside a git tree.'''
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    '''Prints results against baseline, returns the number of regressions.'''
+    regressions = 0
+
+    print('{:<22} {:<28} {:>12} {:>12} {:>8}'.format('benchmark', 'metric', 'baseline', 'current', 'change'))
+    for name, metrics in results.items():
+        for metric, value in sorted(metrics.items()):
+            reference = baseline['results'].get(name, {}).get(metric)
+            if not isinstance(value, float) or not isinstance(reference, float) or not reference:
+                continue
+
+            # rates improve upwards, times and counts downwards
+            change = value / reference - 1.0
+            worse = -change if metric.endswith('_per_s') else change
+
+            flag = ''
+            if worse > tolerance:
+                flag = ' REGRESSION'
+                regressions += 1
+
+            print('{:<22} {:<28} {:>12.4g} {:>12.4g} {:>+7.1f}%{}'.format(
+                name, metric, reference, value, change * 100.0, flag))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks against a simulated controller.')
+    parser.add_argument('names', nargs='*', help='benchmarks to run, all by default: ' + ', '.join(suite.benchmarks))
+    parser.add_argument('--out', help='write results as JSON')
+    parser.add_argument('--baseline', help='compare with a results file, default benchmarks/baselines/baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the default baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='relative change counted as a regression')
+    parser.add_argument('--quick', action='store_true', help='fewer iterations')
+    parser.add_argument('--repeats', type=int, default=3, help='runs of each benchmark, the best one counts')
+    args = parser.parse_args(argv)
+
+    log.basicConfig(level=log.WARNING)
+
+    results = {
+        'commit': commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'repeats': args.repeats,
+        'results': suite.run(args.names, args.quick, args.repeats)
+    }
+
+    for path in [args.out, _baseline if args.save_baseline else None]:
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    baseline = args.baseline or _baseline
+    if not args.save_baseline and os.path.exists(baseline):
+        with open(baseline) as f:
+            regressions = compare(results['results'], json.load(f), args.tolerance)
+        return 1 if regressions else 0
+
+    print(json.dumps(results['results'], indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,226 @@
+from modules.galil_wrapper import GalilController, GalilAxis
+from modules.program_thread import ProgramThread
+from modules.simulator import SimulatedController
+from modules.clock import monotonic
+from .suite import percentile
+import threading
+import argparse
+import logging as log
+import random
+import time
+import sys
+import os
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+##
+# Process
+##
+
+def rss():
+    '''Returns the resident set size in bytes, the peak where /proc is missing.'''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        pass
+
+    if resource is not None:
+        # kilobytes on linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    return 0
+
+
+def cpu():
+    '''Returns user plus system seconds of this process.'''
+    times = os.times()
+    return times[0] + times[1]
+
+
+##
+# Rig
+##
+
+class Rig(object):
+
+    # counts per user unit and travel between the hard stops in units
+    _conversion_factor = 1000.0
+    _travel = 100.0
+
+    def __init__(self, name, axes, latency=0.0, telemetry=True, seed=None):
+        '''One simulated controller with its axes and a recipe loop.'''
+        travel = self._travel * self._conversion_factor
+        self.sim = SimulatedController(axes=axes, latency=latency, limits=(-1000, travel + 1000))
+
+        self.controller = GalilController(transport=self.sim.handle)
+        self.controller.open(name)
+
+        self.axes = {}
+        for letter in axes:
+            axis = GalilAxis(letter, self.controller)
+            axis.conversion_factor = self._conversion_factor
+
+            # as found by homing
+            axis.is_homed = True
+            axis.home_limit = self._travel
+            self.axes[letter] = axis
+
+        if telemetry:
+            # what the connection tab starts for every controller
+            self.controller.startTelemetry()
+            self.controller.startMonitor()
+
+        self.thread = ProgramThread(self.axes, generate(sorted(self.axes), random.Random(seed)), 0)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.thread.stop()
+        self.thread.wait()
+        self.controller.close()
+
+
+def generate(axes, rng, length=10000, rows=4):
+    '''Returns a recipe of rows moves per axis within length ms.'''
+    program = []
+
+    for axis in axes:
+        for at in sorted(rng.randrange(0, length, 100) for i in range(rows)):
+            action = rng.choice(['Timed', 'Range', 'PingPong'])
+
+            if action == 'Timed':
+                args = [rng.randint(1, 20), rng.randrange(100, 1000, 100)]
+            elif action == 'Range':
+                args = [rng.randint(10, 50), rng.randint(0, 100)]
+            else:
+                args = [rng.randint(20, 50), rng.randint(10, 80), rng.randint(1, 3)]
+
+            program.append({'time': at, 'axis': axis, 'action': action, 'args': args})
+
+    return program
+
+
+##
+# Report
+##
+
+class Sampler(object):
+
+    _columns = ['elapsed_s', 'cpu_pct', 'threads', 'rss_mb', 'rss_growth_mb', 'commands_per_s',
+                'rows', 'late_p50_ms', 'late_p99_ms', 'late_max_ms', 'loops']
+
+    def __init__(self, rigs, out=None):
+        '''Samples process and dispatch statistics of the rigs every interval.'''
+        self.rigs = rigs
+        self.out = out
+
+        self._start = self._last = monotonic()
+        self._cpu = cpu()
+        self._rss = rss()
+        self._commands = self.commands()
+        self._rows = dict((rig, 0) for rig in rigs)
+
+        if out is not None:
+            out.write(','.join(self._columns) + '\n')
+        print(' '.join('{:>13}'.format(c) for c in self._columns))
+
+    def commands(self):
+        return sum(rig.sim.commands for rig in self.rigs)
+
+    def lateness(self):
+        '''Returns lateness of the rows dispatched since the last sample.'''
+        late = []
+        for rig in self.rigs:
+            stats = rig.thread.stats
+            new = stats.count - self._rows[rig]
+            self._rows[rig] = stats.count
+
+            # recent only holds the newest rows of a long interval
+            if new > 0:
+                late.extend(entry[3] for entry in list(stats.recent)[-new:])
+        return late
+
+    def sample(self):
+        now = monotonic()
+        dt = now - self._last
+        used = cpu()
+        commands = self.commands()
+        size = rss()
+        late = self.lateness()
+
+        row = [
+            now - self._start,
+            (used - self._cpu) / dt * 100.0,
+            threading.active_count(),
+            size / 1e6,
+            (size - self._rss) / 1e6,
+            (commands - self._commands) / dt,
+            len(late),
+            (percentile(late, 50) or 0.0) * 1000.0,
+            (percentile(late, 99) or 0.0) * 1000.0,
+            max(late or [0.0]) * 1000.0,
+            sum(rig.thread.loop for rig in self.rigs)
+        ]
+
+        self._last, self._cpu, self._commands = now, used, commands
+
+        if self.out is not None:
+            self.out.write(','.join('{:.6g}'.format(v) for v in row) + '\n')
+            self.out.flush()
+        print(' '.join('{:>13.6g}'.format(v) for v in row))
+        return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Drives simulated rigs with generated recipes.')
+    parser.add_argument('--controllers', type=int, default=10)
+    parser.add_argument('--axes', default='ABCDEFGH', help='axis letters of every controller')
+    parser.add_argument('--hours', type=float, default=1.0)
+    parser.add_argument('--interval', type=float, default=10.0, help='seconds between samples')
+    parser.add_argument('--latency', type=float, default=0.001, help='simulated command latency in seconds')
+    parser.add_argument('--no-telemetry', action='store_true', help='skip data record streams and interrupts')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write samples as CSV')
+    args = parser.parse_args(argv)
+
+    log.basicConfig(level=log.WARNING)
+
+    rigs = [Rig('rig{}'.format(i), args.axes, args.latency, not args.no_telemetry, args.seed + i)
+            for i in range(args.controllers)]
+
+    out = open(args.out, 'w') if args.out else None
+    sampler = Sampler(rigs, out)
+
+    for rig in rigs:
+        rig.start()
+
+    deadline = monotonic() + args.hours * 3600.0
+    samples = []
+    try:
+        while monotonic() < deadline:
+            time.sleep(min(args.interval, max(0.0, deadline - monotonic())))
+            samples.append(sampler.sample())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for rig in rigs:
+            rig.stop()
+        if out is not None:
+            out.close()
+
+    if len(samples) > 1:
+        # growth after the first sample, which includes start up
+        hours = (samples[-1][0] - samples[0][0]) / 3600.0
+        print('rss growth {:.3f} MB/h, worst lateness {:.1f} ms'.format(
+            (samples[-1][3] - samples[0][3]) / hours, max(s[9] for s in samples)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
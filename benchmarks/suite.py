@@ -0,0 +1,333 @@
+from threading import Thread
+from collections import OrderedDict
+from modules.galil_wrapper import GalilController, GalilAxis
+from modules.simulator import SimulatedController
+from modules.clock import monotonic
+import logging as log
+
+
+# registered benchmarks in run order, name -> function(quick)
+benchmarks = OrderedDict()
+
+
+def benchmark(func):
+    '''Registers a benchmark, it returns a dict of metrics.'''
+    benchmarks[func.__name__] = func
+    return func
+
+
+def percentile(values, p):
+    '''Returns the p-th percentile of values by nearest rank.'''
+    values = sorted(values)
+    if not values:
+        return None
+    index = int(round(p / 100.0 * (len(values) - 1)))
+    return values[index]
+
+
+def controller(axes='ABCD', **kwargs):
+    '''Returns a controller connected to a new simulated controller.'''
+    sim = SimulatedController(axes=axes, **kwargs)
+    galil = GalilController(transport=sim.handle)
+    galil.open('sim')
+    return galil, sim
+
+
+class _LatencyLog(object):
+
+    def __init__(self):
+        '''Trace channel that keeps command latency and lock wait in memory.'''
+        self.latency = []
+        self.lock_wait = []
+
+    def channel(self, name):
+        return self
+
+    def record(self, command, reply, latency, lock_wait):
+        self.latency.append(latency)
+        self.lock_wait.append(lock_wait)
+
+
+##
+# Command path
+##
+
+@benchmark
+def command_roundtrip(quick=False):
+    '''Single thread GalilController.command against a zero latency simulator.'''
+    galil, sim = controller()
+    count = 2000 if quick else 20000
+
+    start = monotonic()
+    for i in range(count):
+        galil.command('TPA')
+    elapsed = monotonic() - start
+    galil.shutdown()
+
+    return {
+        'commands_per_s': count / elapsed,
+        'mean_us': elapsed / count * 1e6
+    }
+
+
+@benchmark
+def command_contention(quick=False):
+    '''Four threads sharing one handle with 0.5 ms simulated latency.'''
+    galil, sim = controller(latency=0.0005)
+    trace = _LatencyLog()
+    galil.traceTo(trace)
+
+    threads = 4
+    count = 50 if quick else 500
+
+    def worker(axis):
+        for i in range(count):
+            galil.command('TP' + axis)
+
+    workers = [Thread(target=worker, args=(axis,)) for axis in 'ABCD'[:threads]]
+    start = monotonic()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = monotonic() - start
+
+    galil.traceTo(None)
+    galil.shutdown()
+    return {
+        'commands_per_s': threads * count / elapsed,
+        'latency_p50_s': percentile(trace.latency, 50),
+        'lock_wait_p50_s': percentile(trace.lock_wait, 50),
+        'lock_wait_p99_s': percentile(trace.lock_wait, 99)
+    }
+
+
+@benchmark
+def motion_under_polling(quick=False):
+    '''Motion command latency while two threads poll telemetry, 0.5 ms simulated latency.'''
+    galil, sim = controller(latency=0.0005)
+    count = 100 if quick else 1000
+    polling = [True]
+
+    def poll():
+        while polling[0]:
+            galil.command('TPABCD')
+
+    pollers = [Thread(target=poll) for i in range(2)]
+    for t in pollers:
+        t.start()
+
+    latency = []
+    for i in range(count):
+        start = monotonic()
+        galil.command('SPA={}'.format(1000 + i % 2))
+        latency.append(monotonic() - start)
+
+    polling[0] = False
+    for t in pollers:
+        t.join()
+    galil.shutdown()
+
+    return {
+        'motion_p50_s': percentile(latency, 50),
+        'motion_p99_s': percentile(latency, 99)
+    }
+
+
+class _StopProbe(SimulatedController):
+
+    def __init__(self, *args, **kwargs):
+        '''Simulator that notes when the first stop command executes.'''
+        super(_StopProbe, self).__init__(*args, **kwargs)
+        self.stopped = None
+
+    def _execute(self, command):
+        if command.startswith('ST') and self.stopped is None:
+            self.stopped = monotonic()
+        return super(_StopProbe, self)._execute(command)
+
+
+@benchmark
+def stop_latency(quick=False):
+    '''Time from cancel() to ST executing while three threads send motion commands.'''
+    sim = _StopProbe(axes='ABCD', latency=0.0005)
+    galil = GalilController(transport=sim.handle)
+    galil.open('sim')
+
+    axis = GalilAxis('A', galil)
+    busy = [True]
+
+    def load(letter):
+        i = 0
+        while busy[0]:
+            galil.command('SP{}={}'.format(letter, 1000 + i % 2))
+            i += 1
+
+    loaders = [Thread(target=load, args=(letter,)) for letter in 'BCD']
+    for t in loaders:
+        t.start()
+
+    latency = []
+    for i in range(20 if quick else 200):
+        axis.jogMove(10000)
+        galil.scheduler.waitIdle(axis)
+
+        sim.stopped = None
+        start = monotonic()
+        axis.cancel()
+        latency.append(sim.stopped - start)
+
+    busy[0] = False
+    for t in loaders:
+        t.join()
+    galil.shutdown()
+
+    return {
+        'stop_p50_s': percentile(latency, 50),
+        'stop_p99_s': percentile(latency, 99),
+        'stop_max_s': max(latency)
+    }
+
+
+##
+# Scheduler
+##
+
+@benchmark
+def scheduler_dispatch(quick=False):
+    '''Task dispatch rate of the motion scheduler over four axes.'''
+    galil, sim = controller()
+    axes = [GalilAxis(axis, galil) for axis in 'ABCD']
+    count = 2000 if quick else 20000
+
+    def noop():
+        pass
+
+    start = monotonic()
+    for axis in axes:
+        galil.scheduler.schedule(axis, [(noop,)] * count)
+    for axis in axes:
+        galil.scheduler.waitIdle(axis)
+    elapsed = monotonic() - start
+    galil.shutdown()
+
+    return {
+        'tasks_per_s': len(axes) * count / elapsed
+    }
+
+
+@benchmark
+def wait_overhead(quick=False):
+    '''Commands sent and completion delay while waiting on a 0.2 s move.'''
+    results = {}
+
+    for mode in ('polled', 'interrupt'):
+        galil, sim = controller()
+        axis = GalilAxis('A', galil)
+        if mode == 'interrupt':
+            galil.startMonitor()
+
+        # time wait() returned after the end of the move
+        delays = []
+        sent = 0
+        for i in range(3 if quick else 10):
+            # constant speed move of a known duration, acceleration is negligible
+            axis.acceleration = axis.deceleration = 100000000
+            axis.speed = 100000
+            axis.position_relative = 20000
+            axis.enable()
+
+            before = sim.commands
+            start = monotonic()
+            axis.begin()
+            axis.wait()
+            delays.append(monotonic() - start - 0.2)
+            sent += sim.commands - before
+
+        # let the listener exit before the next run
+        galil.shutdown()
+
+        results[mode + '_commands_per_move'] = sent / float(len(delays))
+        results[mode + '_delay_s'] = sum(delays) / len(delays)
+
+    return results
+
+
+##
+# Program
+##
+
+@benchmark
+def program_dispatch(quick=False):
+    '''Dispatch lateness of ProgramThread over a dense recipe.'''
+    from modules.program_thread import ProgramThread
+
+    galil, sim = controller(time_scale=10.0)
+    axes = dict((axis, GalilAxis(axis, galil)) for axis in 'ABCD')
+    rows = 50 if quick else 200
+
+    program = [{'time': i * 5, 'axis': 'ABCD'[i % 4], 'action': 'Timed', 'args': [1, 10]} for i in range(rows)]
+    thread = ProgramThread(axes, program, 1)
+
+    # runs in this thread, the dispatch loop does not need an event loop
+    thread.run()
+    galil.shutdown()
+
+    return {
+        'lateness_mean_s': thread.stats.mean,
+        'lateness_p99_s': thread.stats.percentile(99),
+        'lateness_max_s': thread.stats.max
+    }
+
+
+@benchmark
+def table_model_data(quick=False):
+    '''Cost of ProgramTableModel.data per cell and role.'''
+    from PyQt4.QtCore import Qt
+    from models.program_table_model import ProgramTableModel
+
+    model = ProgramTableModel({'A': None, 'B': None})
+    model.program = [{'time': i * 100, 'axis': 'A', 'action': 'PingPong', 'args': [1, 50, 2]} for i in range(100)]
+
+    roles = [Qt.DisplayRole, Qt.TypeRole, Qt.TagRole, Qt.SuffixRole]
+    indexes = [model.index(row, col) for row in range(len(model.program)) for col in range(len(model.headers))]
+    repeats = 5 if quick else 50
+
+    start = monotonic()
+    for i in range(repeats):
+        for index in indexes:
+            for role in roles:
+                model.data(index, role)
+    elapsed = monotonic() - start
+
+    calls = repeats * len(indexes) * len(roles)
+    return {
+        'per_call_us': elapsed / calls * 1e6,
+        'per_cell_us': elapsed / (repeats * len(indexes)) * 1e6
+    }
+
+
+def best(metric, values):
+    '''Returns the best of repeated measurements, rates are best high.'''
+    return max(values) if metric.endswith('_per_s') else min(values)
+
+
+def run(names=None, quick=False, repeats=3):
+    '''Runs benchmarks by name, returns {name: metrics}, a missing dependency skips one.'''
+    results = OrderedDict()
+
+    for name, func in benchmarks.items():
+        if names and name not in names:
+            continue
+
+        try:
+            runs = [func(quick) for i in range(repeats)]
+        except ImportError as e:
+            log.warning('Skipped {}: {}'.format(name, e))
+            results[name] = {'skipped': str(e)}
+            continue
+
+        # the best run is the least disturbed by the rest of the machine
+        results[name] = dict((metric, best(metric, [r[metric] for r in runs])) for metric in runs[0])
+
+    return results
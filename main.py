@@ -1,8 +1,10 @@
 #!/usr/bin/python2
 from PyQt4 import QtGui, QtCore
 from views import View, ProgramTab, ConnectionTab, AxisSimple, AxisTwoState
-from modules import GalilController, GalilAxis
+from modules import GalilController, GalilAxis, TraceRecorder
+from collections import deque
 import logging as log
+import argparse
 import sys
 
 
@@ -12,24 +14,85 @@ class QtSignals(QtCore.QObject):
 
 
 class QtLogger(log.Handler):
-    def __init__(self):
-        super(QtLogger, self).__init__()
+
+    # period of batched appends to the view (ms)
+    _drain_rate = 40
+
+    def __init__(self, level=log.DEBUG, capacity=10000, max_lines=5000):
+        super(QtLogger, self).__init__(level)
         self.setFormatter(log.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
         log.getLogger().addHandler(self)
-        log.getLogger().setLevel(log.DEBUG)
+
+        # records below level are discarded before they are created or formatted
+        log.getLogger().setLevel(level)
         self.signals = QtSignals()
 
+        self.max_lines = max_lines      # lines kept by the view
+        self.dropped = 0                # records never shown, lost to a full buffer or trimmed
+
+        # ring buffer, the oldest record is overwritten when full
+        self._records = deque(maxlen=capacity)
+        self._reported = 0
+
+        # drain from the GUI thread
+        self._timer = QtCore.QTimer()
+        self._timer.timeout.connect(self.drain)
+        self._timer.start(self._drain_rate)
+
+    def handle(self, record):
+        # deque appends are atomic, skip the handler lock
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
     def emit(self, record):
-        msg = self.format(record)
-        self.signals.append_log.emit(msg)
+        if len(self._records) == self._records.maxlen:
+            self.dropped += 1
+        self._records.append(record)
+
+    def drain(self):
+        '''Formats pending records and appends them to the view at once.'''
+        records = []
+        while True:
+            try:
+                records.append(self._records.popleft())
+            except IndexError:
+                break
+
+        # only format what the view keeps
+        if len(records) > self.max_lines:
+            self.dropped += len(records) - self.max_lines
+            records = records[-self.max_lines:]
+
+        lines = []
+        if self.dropped != self._reported:
+            lines.append('{} log records dropped.'.format(self.dropped - self._reported))
+            self._reported = self.dropped
+
+        lines.extend(self.format(record) for record in records)
+
+        if lines:
+            self.signals.append_log.emit('\n'.join(lines))
+
+
+def parseArgs(argv):
+    '''Returns (options, arguments left to Qt) of the command line.'''
+    parser = argparse.ArgumentParser(description='GUI for Trolley Tester')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='record every controller command, decode with: python -m modules.trace stats PATH')
+    parser.add_argument('--record', metavar='DIR',
+                        help='record program runs, read with modules.recorder.Run(DIR/run-...)')
+    return parser.parse_known_args(argv)
 
 
 class MainWindow(View['MainWindow']):
 
     closing = QtCore.pyqtSignal()
 
-    def __init__(self, parent=None):
+    def __init__(self, options=None, parent=None):
         super(MainWindow, self).__init__(parent)
+        self.options = options or parseArgs([])[0]
         self.setupUi(self)
 
         # maximize
@@ -63,8 +126,20 @@ class MainWindow(View['MainWindow']):
             'Vane (Front)': GalilAxis('G', self.controllers['Galil 0'])
         }
 
+        # telemetry history of every axis for plots
+        for controller in self.controllers.values():
+            controller.startHistory()
+
+        # optional command trace, decode with: python -m modules.trace stats <path>
+        if self.options.trace:
+            self.trace = TraceRecorder(self.options.trace)
+            for name, controller in self.controllers.items():
+                controller.traceTo(self.trace, name)
+
         # setup logging window
-        QtLogger().signals.append_log.connect(self.logView.appendPlainText)
+        self.logger = QtLogger()
+        self.logger.signals.append_log.connect(self.logView.appendPlainText)
+        self.logView.setMaximumBlockCount(self.logger.max_lines)
 
     def setupFrontend(self):
         # Connection Tab
@@ -98,7 +173,8 @@ class MainWindow(View['MainWindow']):
         self.tabWidget.addTab(tab, 'Vanes')
 
         # Program Tab
-        self.programTab = ProgramTab(self.axes, self)
+        # optional run recordings, read with modules.recorder.Run(<path>/run-...)
+        self.programTab = ProgramTab(self.axes, self, self.options.record)
         self.tabWidget.addTab(self.programTab, 'Program')
 
     def closeEvent(self, event):
@@ -107,9 +183,11 @@ class MainWindow(View['MainWindow']):
 
 
 if __name__ == '__main__':
-    app = QtGui.QApplication(sys.argv)
+    # a missing path prints the usage and exits before any window opens
+    options, arguments = parseArgs(sys.argv[1:])
+    app = QtGui.QApplication(sys.argv[:1] + arguments)
 
-    wnd = MainWindow()
+    wnd = MainWindow(options)
     wnd.show()
 
     sys.exit(app.exec_())
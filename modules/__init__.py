@@ -1,2 +1,15 @@
 from .galil_wrapper import GalilController, GalilAxis
-from .program_thread import ProgramThread
+from .telemetry import Snapshot, DataRecord, TelemetryStream
+from .history import TelemetryHistory
+from .recorder import RunRecorder, Run
+from .capture import Capture
+from .futures import Future
+from .trace import TraceRecorder
+from .simulator import SimulatedController
+from .aio import AsyncController, AsyncAxis
+
+# program threads need PyQt4, everything else also runs headless
+try:
+    from .program_thread import ProgramThread, CompiledProgramThread
+except ImportError:
+    pass
@@ -0,0 +1,149 @@
+from .galil_wrapper import GalilAxis
+from .futures import Cancelled
+
+# asyncio front end, e.g. from one event loop:
+#   rig = AsyncController(controller)
+#   yield from asyncio.gather(rig.axis('A').move_absolute(5, 20), rig.axis('B').move_absolute(5, 40))
+try:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+except ImportError:
+    asyncio = None
+
+
+def wrap(future, loop=None):
+    '''Returns an asyncio future that follows a modules.futures.Future.'''
+    loop = loop or asyncio.get_event_loop()
+    result = loop.create_future()
+
+    def copy(source):
+        if result.cancelled():
+            return
+
+        exception = source.exception()
+        if isinstance(exception, Cancelled):
+            result.cancel()
+        elif exception is not None:
+            result.set_exception(exception)
+        else:
+            result.set_result(source.result())
+
+    # callbacks run on the scheduler thread, results are set on the loop
+    future.add_done_callback(lambda source: loop.call_soon_threadsafe(copy, source))
+    return result
+
+
+class AsyncController(object):
+
+    # one thread per connection of the controller: motion, query and stop
+    _workers = 3
+
+    def __init__(self, controller, loop=None):
+        '''Awaitable wrapper of a GalilController, commands run on a small per-controller pool.'''
+        if asyncio is None:
+            raise RuntimeError('asyncio is not available.')
+
+        self.controller = controller
+        self.loop = loop
+        self._executor = ThreadPoolExecutor(self._workers)
+        self._axes = {}
+
+    def _loop(self):
+        return self.loop or asyncio.get_event_loop()
+
+    def call(self, func, *args):
+        '''Runs a blocking call of the synchronous API on the pool.'''
+        return self._loop().run_in_executor(self._executor, func, *args)
+
+    def command(self, command):
+        return self.call(self.controller.command, command)
+
+    def command_batch(self, commands):
+        return self.call(self.controller.commandBatch, commands)
+
+    def snapshot(self, axes=None, fields=None, max_age=0):
+        return self.call(self.controller.snapshot, axes, fields, max_age)
+
+    def stop(self):
+        return self.call(self.controller.stop)
+
+    def axis(self, letter):
+        '''Returns the AsyncAxis of letter, binding a new GalilAxis if needed.'''
+        letter = letter.upper()
+        if letter not in self._axes:
+            axis = self.controller._axes.get(letter)
+            if not isinstance(axis, GalilAxis):
+                axis = GalilAxis(letter, self.controller)
+            self._axes[letter] = AsyncAxis(axis, self)
+
+        return self._axes[letter]
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class AsyncAxis(object):
+
+    def __init__(self, axis, controller):
+        '''Awaitable wrapper of a GalilAxis, moves run on the controller scheduler.'''
+        self.axis = axis
+        self.controller = controller
+
+    def _queued(self):
+        # resolves once the scheduler ran everything queued so far, no thread waits
+        return wrap(self.axis.done_async(), self.controller._loop())
+
+    ##
+    # Moves, each resolves when the move finished
+    ##
+
+    def move_absolute(self, speed, pos):
+        self.axis.absoluteMove(speed, pos)
+        return self._queued()
+
+    def move_relative(self, speed, pos):
+        self.axis.relativeMove(speed, pos)
+        return self._queued()
+
+    def move_timed(self, speed, t):
+        self.axis.timedMove(speed, t)
+        return self._queued()
+
+    def move_range(self, speed, pos):
+        self.axis.rangeMove(speed, pos)
+        return self._queued()
+
+    def ping_pong(self, speed, repeats, a, b):
+        self.axis.pingPong(speed, repeats, a, b)
+        return self._queued()
+
+    def home(self, speed, torque):
+        self.axis.home(speed, torque)
+        return self._queued()
+
+    def jog(self, speed):
+        '''Resolves once jogging started.'''
+        self.axis.jogMove(speed)
+        return self._queued()
+
+    ##
+    # State
+    ##
+
+    def wait_complete(self):
+        '''Resolves when the current motion completes.'''
+        return wrap(self.axis.wait_async(), self.controller._loop())
+
+    def cancel(self):
+        return self.controller.call(self.axis.cancel)
+
+    def get(self, name):
+        '''Reads a register property, e.g. yield from axis.get('speed').'''
+        return self.controller.call(getattr, self.axis, name)
+
+    def set(self, name, value):
+        return self.controller.call(setattr, self.axis, name, value)
+
+    def telemetry(self, max_age=0):
+        return self.controller.call(self.axis.telemetry, max_age)
@@ -0,0 +1,201 @@
+from collections import OrderedDict
+import argparse
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# metrics of every cycle, see cycles
+fields = ('start', 'stroke_time', 'stroke', 'peak_torque', 'rms_torque', 'peak_error', 'rms_error',
+          'overshoot', 'settling_time')
+
+# records at either end of a move whose turns are overshoot, not the next stroke
+settle_records = 2
+
+
+def moves(moving):
+    '''Returns (starts, stops) of the runs where the moving flag is set, unfinished runs are left out.'''
+    moving = np.asarray(moving) > 0.5       # NaN is not moving
+    edges = np.diff(moving.view(np.int8))
+
+    starts = np.flatnonzero(edges == 1) + 1
+    stops = np.flatnonzero(edges == -1) + 1
+
+    if len(moving) and moving[0]:
+        starts = np.concatenate(([0], starts))
+    if len(moving) and moving[-1]:
+        starts = starts[:-1]
+
+    return starts, stops
+
+
+def extrema(position, deadband=0.0):
+    '''Returns the indices where position changes direction.'''
+    steps = np.diff(np.asarray(position, dtype=np.float64))
+    direction = np.where(steps > deadband, 1, np.where(steps < -deadband, -1, 0))
+
+    # steps inside the deadband keep the direction of the step before them
+    last = np.maximum.accumulate(np.where(direction != 0, np.arange(len(direction)), 0))
+    direction = direction[last]
+
+    turns = np.flatnonzero(direction[1:] != direction[:-1]) + 1
+    return turns[direction[turns] != 0]
+
+
+def reversals(position, deadband=0.0):
+    '''Returns (starts, stops) of the strokes between direction changes of position.'''
+    turns = extrema(position, deadband)
+    return turns[:-1], turns[1:]
+
+
+def split(starts, stops, points, margin=0):
+    '''Returns (starts, stops) with every run also cut at the points more than margin inside it.'''
+    starts = np.asarray(starts, dtype=np.intp)
+    stops = np.asarray(stops, dtype=np.intp)
+    points = np.asarray(points, dtype=np.intp)
+    if not len(starts):
+        return starts, stops
+
+    # the run each point falls in, points between runs are dropped
+    run = np.maximum(np.searchsorted(starts, points, 'right') - 1, 0)
+    points = points[(points > starts[run] + margin) & (points < stops[run] - margin)]
+
+    # runs do not overlap, so each cut ends one run where the next begins
+    return np.sort(np.concatenate((starts, points))), np.sort(np.concatenate((stops, points)))
+
+
+def _reduce(ufunc, values, starts, stops):
+    '''Returns ufunc reduced over values[start:stop] of every segment, NaN for empty ones.'''
+    if not len(starts):
+        return np.empty(0)
+
+    bounds = np.empty(2 * len(starts), dtype=np.intp)
+    bounds[0::2] = starts
+    bounds[1::2] = stops
+
+    # a segment ending at the end of values needs no closing bound
+    if bounds[-1] >= len(values):
+        bounds = bounds[:-1]
+
+    result = ufunc.reduceat(values, bounds)[0::2].astype(np.float64)
+    result[stops <= starts] = np.nan
+    return result
+
+
+def cycles(times, position, torque, error, starts, stops, band=10.0):
+    '''Returns {metric: array} with one entry per move of (starts, stops), see fields.'''
+    # a move settles between its stop and the next start, its final position
+    # is where the axis is right before the next move begins
+    times = np.asarray(times, dtype=np.float64)
+    position = np.asarray(position, dtype=np.float64)
+    torque = np.asarray(torque, dtype=np.float64)
+    error = np.asarray(error, dtype=np.float64)
+
+    n = len(times)
+    starts = np.asarray(starts, dtype=np.intp)
+    stops = np.asarray(stops, dtype=np.intp)
+    ends = np.concatenate((starts[1:], [n]))         # end of each settling window
+    samples = (stops - starts).astype(np.float64)
+
+    last = np.minimum(stops, n - 1)
+    final = position[ends - 1]
+    direction = np.sign(final - position[starts])
+
+    metrics = OrderedDict()
+    metrics['start'] = times[starts]
+    metrics['stroke_time'] = times[last] - times[starts]
+    metrics['stroke'] = final - position[starts]
+    metrics['peak_torque'] = _reduce(np.maximum, np.abs(torque), starts, stops)
+    metrics['rms_torque'] = np.sqrt(_reduce(np.add, torque * torque, starts, stops) / samples)
+    metrics['peak_error'] = _reduce(np.maximum, np.abs(error), starts, stops)
+    metrics['rms_error'] = np.sqrt(_reduce(np.add, error * error, starts, stops) / samples)
+
+    if not len(starts):
+        metrics['overshoot'] = metrics['settling_time'] = np.empty(0)
+        return metrics
+
+    # windows from each start to the next tile the samples after the first start
+    first = starts[0]
+    lengths = ends - starts
+    offset = (position[first:] - np.repeat(final, lengths)) * np.repeat(direction, lengths)
+    metrics['overshoot'] = np.maximum(_reduce(np.maximum, offset, starts - first, ends - first), 0.0)
+
+    # settled after the last sample outside the band, within the settling window
+    outside = np.where(np.abs(offset) > band, np.arange(first, n), -1)
+    latest = _reduce(np.maximum, outside, stops - first, ends - first)
+    settled = np.where(np.isnan(latest) | (latest < stops), stops, latest + 1).astype(np.intp)
+    metrics['settling_time'] = times[np.minimum(settled, n - 1)] - times[last]
+
+    return metrics
+
+
+def analyze(run, axis, band=10.0, deadband=0.0):
+    '''Returns per cycle metrics of axis in a recorder.Run, with the dispatched action of each cycle.'''
+    table = 'telemetry/' + axis
+    times = run.column(table, 'time')
+    position = run.column(table, 'position')
+
+    # cycles follow the moving flag of the data records, position reversals without it
+    moving = run.column(table, 'moving')
+    if len(moving) and not np.isnan(moving).all():
+        # back to back strokes keep the flag set, they are also cut where the axis turns
+        starts, stops = moves(moving)
+        starts, stops = split(starts, stops, extrema(position, deadband), settle_records)
+    else:
+        starts, stops = reversals(position, deadband)
+
+    metrics = cycles(times, position, run.column(table, 'torque'), run.column(table, 'error'),
+                     starts, stops, band)
+
+    # the last row dispatched to axis before a cycle started it
+    events = run.column('events', 'axis')
+    mine = np.flatnonzero(events == run.names.index(axis)) if axis in run.names else np.empty(0, np.intp)
+    dispatched = run.column('events', 'time')[mine]
+    index = np.searchsorted(dispatched, metrics['start'], 'right') - 1
+
+    metrics['action'] = np.full(len(index), -1, dtype=np.int32)
+    if len(mine):
+        actions = run.column('events', 'action')[mine]
+        metrics['action'] = np.where(index >= 0, actions[np.maximum(index, 0)], -1)
+    return metrics
+
+
+def main(argv=None):
+    from .recorder import Run
+
+    parser = argparse.ArgumentParser(description='Summarizes the cycles of a run recording.')
+    parser.add_argument('path')
+    parser.add_argument('--axis', action='append', help='axis name, all recorded axes by default')
+    parser.add_argument('--band', type=float, default=10.0, help='settling band (counts)')
+    parser.add_argument('--deadband', type=float, default=0.0, help='ignored position steps (counts)')
+    args = parser.parse_args(argv)
+
+    run = Run(args.path)
+    axes = args.axis or [table[len('telemetry/'):] for table in run.tables if table.startswith('telemetry/')]
+
+    print('{:<16} {:<10} {:>9} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10} {:>12}'.format(
+        'axis', 'action', 'cycles', 'time ms', 'peak trq', 'rms trq', 'rms err', 'overshoot', 'settle ms',
+        'time drift'))
+    for axis in axes:
+        metrics = analyze(run, axis, args.band, args.deadband)
+        for action in np.unique(metrics['action']):
+            selected = metrics['action'] == action
+            stroke_time = metrics['stroke_time'][selected]
+
+            # median of the last tenth of the cycles against the first, wear shows as drift
+            tenth = max(1, len(stroke_time) // 10)
+            drift = np.nanmedian(stroke_time[-tenth:]) - np.nanmedian(stroke_time[:tenth])
+
+            print('{:<16} {:<10} {:>9} {:>10.1f} {:>10.3f} {:>10.3f} {:>10.1f} {:>10.1f} {:>10.1f} {:>+12.2f}'.format(
+                axis, run.name(action) if action >= 0 else '-', int(selected.sum()),
+                np.nanmedian(stroke_time) * 1000.0, np.nanmedian(metrics['peak_torque'][selected]),
+                np.nanmedian(metrics['rms_torque'][selected]), np.nanmedian(metrics['rms_error'][selected]),
+                np.nanmedian(metrics['overshoot'][selected]), np.nanmedian(metrics['settling_time'][selected]) * 1000.0,
+                drift * 1000.0))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,162 @@
+from .transport import GclibError
+from .clock import monotonic
+import logging as log
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Capture(object):
+
+    # RD data source of each field
+    _sources = {
+        'position': '_TP',
+        'velocity': '_TV',
+        'torque': '_TT',
+        'error': '_TE'
+    }
+
+    # fields in counts, scaled like the axis properties
+    _scaled = ('position', 'velocity', 'error')
+
+    # array elements a capture may take, a DMC-40x0 has 24000 for all programs
+    _max_elements = 8000
+
+    def __init__(self, axis, fields=('position', 'torque'), samples=1000, rate=1000.0, circular=False):
+        '''Records fields of axis on the controller with RA/RD/RC, uploaded after the move.'''
+        # the controller has one recorder, arming a capture replaces any other,
+        # a circular capture records until halted and keeps the latest samples
+        if np is None:
+            raise RuntimeError('numpy is required for captures.')
+        if samples * len(fields) > self._max_elements:
+            raise ValueError('{} samples of {} fields exceed {} array elements.'.format(
+                samples, len(fields), self._max_elements))
+
+        self.axis = axis
+        self.controller = axis.controller
+        self.fields = tuple(fields)
+        self.samples = samples
+        self.rate = rate                # requested records per second
+        self.circular = circular
+        self.period = None              # seconds between records, set when armed
+        self.data = None                # {field: array} once uploaded
+
+        letter = axis.axis
+        self.arrays = ['cp{}{}'.format(letter, i) for i in range(len(self.fields))]
+        self.sources = ['{}{}'.format(self._sources[field], letter) for field in self.fields]
+
+        self._interval = 1              # RC n records every 2^n servo samples
+        self._started = None            # host time of the trigger
+        self._stopped = None            # host time of the halt
+
+    @classmethod
+    def samplesFor(cls, fields, duration=None, rate=1000.0):
+        '''Returns records covering duration seconds at rate, at most what the arrays can take.'''
+        limit = cls._max_elements // len(fields)
+        if duration is None:
+            return limit
+
+        # acceleration makes a move take a little longer than its distance at speed
+        return max(1, min(limit, int(math.ceil(duration * rate)) * 11 // 10))
+
+    def arm(self):
+        '''Dimensions the arrays and selects their sources, returns True on success.'''
+        try:
+            sample_time = float(self.controller.command('MG_TM')) / 1e6
+        except ValueError:
+            sample_time = 0
+        if sample_time <= 0:
+            sample_time = 0.001         # TM 1000, the default
+
+        # the fastest recording is every second servo sample, 1 kHz needs TM 500
+        n = int(round(math.log(1.0 / (sample_time * self.rate), 2)))
+        self._interval = max(1, min(8, n))
+        self.period = sample_time * 2 ** self._interval
+
+        # arrays of the right size are kept from the last capture
+        dimensioned = self.controller.capture_arrays
+        resized = [name for name in self.arrays if dimensioned.get(name) != self.samples]
+
+        commands = ['RC0']
+        commands += ['DA {}[]'.format(name) for name in resized if name in dimensioned]
+        commands += ['DM {}[{}]'.format(name, self.samples) for name in resized]
+        commands += ['RA ' + ','.join('{}[]'.format(name) for name in self.arrays),
+                     'RD ' + ','.join(self.sources)]
+
+        errors = self.controller.commandBatch(commands)
+        if errors:
+            # e.g. arrays lost in a reset, dimensioned again next time
+            for name in self.arrays:
+                dimensioned.pop(name, None)
+            log.warning('Capture on axis {} unavailable: {}'.format(self.axis.axis, errors))
+            return False
+
+        dimensioned.update((name, self.samples) for name in self.arrays)
+        self.data = None
+        return True
+
+    def trigger(self):
+        '''Returns the command that starts recording, sent on the same line as BG.'''
+        self._started = monotonic()
+        self._stopped = None
+        return 'RC{},{}'.format(self._interval, -self.samples if self.circular else self.samples)
+
+    def halt(self):
+        '''Stops recording now, e.g. on the event a circular capture waits for.'''
+        self.controller.command('RC0')
+        self._stopped = monotonic()
+
+    def recording(self):
+        try:
+            return bool(int(float(self.controller.command('MG_RC'))))
+        except ValueError:
+            return False
+
+    def upload(self):
+        '''Stops recording, returns {field: array} of the records so far with their 'time'.'''
+        if self.recording():
+            self.halt()
+
+        # _RD is the element the next record goes to
+        try:
+            count = max(0, min(self.samples, int(float(self.controller.command('MG_RD')))))
+        except ValueError:
+            count = 0
+
+        # a circular recording that wrapped starts at _RD, the host clock tells
+        # how often it went round, records come every period while recording
+        first = 0
+        shift = 0
+        if self.circular and self._started is not None:
+            written = ((self._stopped or monotonic()) - self._started) / self.period
+            laps = int(round((written - count) / float(self.samples)))
+            if laps > 0:
+                first = count + (laps - 1) * self.samples
+                shift = count
+                count = self.samples
+
+        data = {'time': (first + np.arange(count)) * self.period}
+        g = self.controller._g
+        for field, name in zip(self.fields, self.arrays):
+            values = []
+            if count:
+                try:
+                    with g.lock:
+                        values = g.GArrayUpload(name, 0, count - 1)
+                except GclibError as e:
+                    log.warning('Upload of {} failed: {}'.format(name, e))
+                    values = [float('nan')] * count
+
+            # some gclib versions return the comma separated text
+            if hasattr(values, 'split'):
+                values = values.split(',')
+
+            data[field] = np.roll(np.array(values, dtype=np.float64), -shift)
+            if field in self._scaled:
+                data[field] /= self.axis.conversion_factor
+
+        self.data = data
+        return data
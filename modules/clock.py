@@ -0,0 +1,30 @@
+import time
+import sys
+
+# monotonic seconds for deadlines and latency measurements, python 2 lacks
+# time.monotonic so fall back to the platform clock that never steps
+try:
+    monotonic = time.monotonic
+
+except AttributeError:
+    if sys.platform == 'win32':
+        # QueryPerformanceCounter
+        monotonic = time.clock
+
+    else:
+        import ctypes
+        import ctypes.util
+
+        class _Timespec(ctypes.Structure):
+            _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+        _CLOCK_MONOTONIC = 1
+        _librt = ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c'), use_errno=True)
+        _clock_gettime = _librt.clock_gettime
+        _clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_Timespec)]
+
+        def monotonic():
+            t = _Timespec()
+            if _clock_gettime(_CLOCK_MONOTONIC, ctypes.byref(t)) != 0:
+                raise OSError(ctypes.get_errno(), 'clock_gettime failed')
+            return t.tv_sec + t.tv_nsec * 1e-9
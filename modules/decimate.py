@@ -0,0 +1,27 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def minmax(x, y, bins):
+    '''Reduces x, y to the first minimum and maximum of y in each of bins equal runs, in order.'''
+    # a line through the extremes of every pixel column looks like the full trace
+    n = len(y)
+    if n <= 2 * bins:
+        return x, y
+
+    size = n // bins
+    start = n - size * bins             # the oldest samples that do not fill a run are dropped
+    runs = y[start:].reshape(bins, size)
+
+    offsets = start + np.arange(bins) * size
+    lo = offsets + runs.argmin(axis=1)
+    hi = offsets + runs.argmax(axis=1)
+
+    # keep time order inside each run
+    index = np.empty(2 * bins, dtype=np.intp)
+    index[0::2] = np.minimum(lo, hi)
+    index[1::2] = np.maximum(lo, hi)
+
+    return x[index], y[index]
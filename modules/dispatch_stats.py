@@ -0,0 +1,68 @@
+from collections import deque
+import bisect
+
+
+class DispatchStats(object):
+
+    # upper edges of the lateness histogram bins in seconds, 10us to 10s in
+    # ten bins per decade, the last bin counts everything later
+    _edges = [1e-5 * 10 ** (i / 10.0) for i in range(61)]
+
+    def __init__(self, history=1000):
+        '''Lateness of dispatched events as a fixed size histogram.'''
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+        self._counts = [0] * (len(self._edges) + 1)
+
+        # most recent (row, planned, actual, lateness)
+        self.recent = deque(maxlen=history)
+
+    def record(self, planned, actual, row=None):
+        '''Adds one event that was due at planned and ran at actual (seconds).'''
+        lateness = actual - planned
+
+        self.count += 1
+        self.total += lateness
+        self.min = lateness if self.min is None else min(self.min, lateness)
+        self.max = lateness if self.max is None else max(self.max, lateness)
+
+        self._counts[bisect.bisect_left(self._edges, lateness)] += 1
+        self.recent.append((row, planned, actual, lateness))
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, p):
+        '''Returns the upper bin edge below which p percent of events fall.'''
+        if not self.count:
+            return None
+
+        rank = self.count * p / 100.0
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank and count:
+                return self._edges[index] if index < len(self._edges) else self.max
+
+        return self.max
+
+    def histogram(self):
+        '''Returns [(upper edge, count)] of the non empty bins.'''
+        edges = self._edges + [float('inf')]
+        return [(edges[i], count) for i, count in enumerate(self._counts) if count]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p99.9': self.percentile(99.9)
+        }
@@ -0,0 +1,88 @@
+from threading import Event, Lock, Thread
+import logging as log
+
+
+class Timeout(Exception):
+    pass
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Future(object):
+
+    def __init__(self):
+        '''Result of an operation that completes on another thread.'''
+        self._done = Event()
+        self._lock = Lock()
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        '''Blocks until done, returns the result or raises its exception.'''
+        if not self._done.wait(timeout):
+            raise Timeout()
+
+        if self._exception is not None:
+            raise self._exception
+
+        return self._result
+
+    def exception(self, timeout=None):
+        '''Blocks until done, returns the exception or None.'''
+        if not self._done.wait(timeout):
+            raise Timeout()
+
+        return self._exception
+
+    def add_done_callback(self, callback):
+        '''Calls callback(future) when done, immediately if already done.'''
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+
+        self._call(callback)
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            self._call(callback)
+
+    def _call(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            log.exception('Future callback failed.')
+
+
+def background(func, *args):
+    '''Runs func on a daemon thread, returns a Future of its result.'''
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+    thread = Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return future
@@ -1,17 +1,84 @@
-from threading import Thread, Timer, Lock, Event
+from threading import Lock, Event, local, current_thread
+from contextlib import contextmanager
 import logging as log
-import gclib
+from .telemetry import Snapshot, TelemetryStream
+from .scheduler import MotionScheduler, Poll, Watch, Notify
+from .interrupts import MotionMonitor
+from .futures import Future, background
+from .clock import monotonic
+from .task_compiler import Batch, compileTasks
+from .routines import RoutineLibrary
+from .io_service import IOService
+from .history import TelemetryHistory
+from .capture import Capture
+from .transport import GclibError, gclibHandle
 import time
+import re
+
+
+# interrogations that may run on the query handle, e.g. MG_BGA, TPABC, SPA=?
+_query = re.compile(r'^(MG|TP|TV|TT|TE|TS|TD|RP)[^;]*$|^[A-Z]{2}[A-H]*=\?$')
+
+# commands recorded by the current thread instead of being sent
+_recording = local()
 
 
 class GalilController(object):
 
-    def __init__(self, address=None, baud=None):
-        '''Initializes a Galil Controller.'''
-        self._g = gclib.py()            # instance of gclib class
+    # interrogation commands for each telemetry field
+    _telemetry = {
+        'position': 'TP',
+        'velocity': 'TV',
+        'torque': 'TT',
+        'error': 'TE'
+    }
+
+    # longest command line sent to the controller
+    _line_limit = 80
+
+    # controller variable counting the commands completed on a batch line
+    _batch_marker = 'tq'
+
+    def __init__(self, address=None, baud=None, transport=None, query_udp=False):
+        '''Initializes a Galil Controller, transport returns new gclib-like handles.'''
+        self._transport = transport or gclibHandle
+        self._g = self._transport()     # instance of gclib class for motion and configuration
         self._g.lock = Lock()           # insert a lock for thread safe interactions
+        self._g.trace = None            # optional command trace channel
+
+        # interrogations use a second connection so polling never waits on motion
+        self._q = self._transport()
+        self._q.lock = Lock()
+        self._q.trace = None
+        self._q.connected = False
+        self.query_udp = query_udp      # open the query handle with --command UDP
+
+        # stop and halt commands skip the queue on a third connection
+        self._s = self._transport()
+        self._s.lock = Lock()
+        self._s.trace = None
+        self._s.connected = False
 
         self.connected = False          # connection flag
+        self.address = None             # address of open connection
+        self.stream = None              # data record telemetry stream
+        self.history = None             # telemetry history, see startHistory
+        self.capture_arrays = {}        # {name: size} dimensioned by captures
+        self.monitor = None             # motion complete interrupt listener
+
+        self._axes = {}                 # axes bound to this controller
+        self._snapshot = None           # last telemetry snapshot
+
+        # motion routines run on the controller
+        self.routines = RoutineLibrary(self)
+
+        # one motion scheduler multiplexes all axes of this controller
+        self.scheduler = MotionScheduler(self)
+        self.scheduler.start()
+
+        # blocking calls of the GUI run here
+        self.io = IOService(self)
+        self.io.start()
 
         if address is not None:
             self.open(address, baud)    # open connection
@@ -21,47 +88,357 @@ class GalilController(object):
     # Basic Wrappers
     ##
 
-    def open(self, address, baud=None):
-        '''Opens connection to controller.'''
+    def open(self, address, baud=None, timeout=None):
+        '''Opens connection to controller, timeout (seconds) also applies to its commands.'''
         cmd_string = '-a ' + str(address)
         if baud is not None:
             cmd_string = cmd_string + ' -b ' + str(baud)
+        if timeout is not None:
+            cmd_string = cmd_string + ' -t ' + str(int(timeout * 1000))
 
         cmd_string = cmd_string + ' --direct'
 
         try:
             self._g.GOpen(cmd_string)
             self.connected = True
+            self.capture_arrays = {}
+            self.address = address
+            self.invalidateShadow()
+            self.routines.loaded = False
             log.info('Connected at ({})'.format(address))
-            return True
 
-        except gclib.GclibError:
+        except GclibError:
             log.error('No response at ({})'.format(address))
             return False
 
+        # a serial port takes one connection
+        if baud is None:
+            self.openQuery(address)
+            self.openStop(address)
+
+        return True
+
+    def openAsync(self, address, baud=None, timeout=None, progress=None):
+        '''Opens and sets up the connection in the background, returns a Future of success.'''
+        # progress(step) is called from background threads as each step finishes
+        def report(step):
+            if progress is not None:
+                progress(step)
+
+        def run():
+            report('Connecting')
+            if not self.open(address, baud, timeout):
+                return False
+
+            self.setup(report)
+            return True
+
+        return background(run)
+
+    def setup(self, progress=None):
+        '''Runs the post-connect steps concurrently, each on its own connection where possible.'''
+        steps = [
+            ('Motors off', self.disable),
+            ('Parameters', self.syncParameters),
+            ('Telemetry', self.startTelemetry),
+            ('Interrupts', self.startMonitor),
+            ('Routines', self.routines.download)
+        ]
+        futures = [background(step) for name, step in steps]
+
+        for (name, step), future in zip(steps, futures):
+            exception = future.exception()
+            if exception is not None:
+                log.error('{} failed at ({}): {}'.format(name, self.address, exception))
+            elif progress is not None:
+                progress(name)
+
+    def _openHandle(self, g, cmd_string):
+        self._closeHandle(g)
+        try:
+            g.GOpen(cmd_string)
+            g.connected = True
+            return True
+
+        except GclibError:
+            return False
+
+    def _closeHandle(self, g):
+        if g.connected:
+            g.connected = False
+            with g.lock:
+                try:
+                    g.GClose()
+                except GclibError:
+                    pass
+
+    def openQuery(self, address):
+        '''Opens the query handle, queries share the motion handle if it fails.'''
+        cmd_string = '-a {} --direct'.format(address)
+        if self.query_udp:
+            cmd_string = cmd_string + ' --command UDP'
+
+        if not self._openHandle(self._q, cmd_string):
+            log.warning('Queries share the motion connection at ({})'.format(address))
+            return False
+        return True
+
+    def closeQuery(self):
+        self._closeHandle(self._q)
+
+    def openStop(self, address):
+        '''Opens the stop handle, urgent commands share the motion handle if it fails.'''
+        if not self._openHandle(self._s, '-a {} --direct'.format(address)):
+            log.warning('Stops share the motion connection at ({})'.format(address))
+            return False
+        return True
+
+    def closeStop(self):
+        self._closeHandle(self._s)
+
     def close(self):
         '''Closes active connection to controller.'''
         log.info('Disconnected.')
+        self.stopTelemetry()
+        self.stopMonitor()
+        self.closeQuery()
+        self.closeStop()
         self._g.GClose()
         self.connected = False
 
+    def shutdown(self):
+        '''Closes the connection and ends every thread of the controller, it cannot be used after.'''
+        threads = [self.monitor, self.stream, self.scheduler, self.io]
+        if self.connected:
+            self.close()
+
+        self.scheduler.stop()
+        self.io.stop()
+        for thread in threads:
+            if thread is not None and thread is not current_thread() and thread.is_alive():
+                thread.join(2.0)
+
     def info(self):
         '''Returns info string from controller.'''
         try:
             return self._g.GInfo()
 
-        except gclib.GclibError:
+        except GclibError:
             log.error('No active connection.')
 
     def command(self, command):
         '''Wrapper for GCommand.'''
-        with self._g.lock:
+        commands = getattr(_recording, 'commands', None)
+        if commands is not None:
+            commands.append(command)
+            return ''
+
+        return self._send(self._route(command), command)
+
+    def _route(self, command):
+        '''Returns the handle that command goes to, interrogations stay off the motion handle.'''
+        if self._q.connected and _query.match(command):
+            return self._q
+        return self._g
+
+    def urgent(self, command):
+        '''Sends command ahead of queued commands, never recorded into a batch.'''
+        g = self._s if self._s.connected else self._g
+        return self._send(g, command)
+
+    def _send(self, g, command):
+        trace = g.trace
+        if trace is not None:
+            requested = monotonic()
+
+        with g.lock:
+            if trace is not None:
+                acquired = monotonic()
+
             try:
-                ret = self._g.GCommand(command)
-            except gclib.GclibError:
+                ret = g.GCommand(command)
+            except GclibError:
                 ret = '-1'
-            log.debug('{} -> {}'.format(command, ret))
-            return ret
+            log.debug('%s -> %s', command, ret)
+
+        if trace is not None:
+            trace.record(command, ret, monotonic() - acquired, acquired - requested)
+
+        return ret
+
+    def traceTo(self, recorder, name=None):
+        '''Records every command in a TraceRecorder, None stops recording.'''
+        if recorder is None:
+            self._g.trace = None
+        else:
+            self._g.trace = recorder.channel(name or self.address)
+        self._q.trace = self._s.trace = self._g.trace
+
+    @contextmanager
+    def recording(self):
+        '''Collects the commands issued by this thread instead of sending them.'''
+        _recording.commands = []
+        try:
+            yield _recording.commands
+        finally:
+            _recording.commands = None
+
+    def commandBatch(self, commands):
+        '''Sends commands on as few lines as possible, returns failures as (command, error).'''
+        errors = []
+        pending = list(commands)
+
+        while pending:
+            # markers count completed commands: tq=0;PRA=10;tq=1;SPA=5;tq=2;BGA
+            line = pending[0]
+            count = 1
+            while count < len(pending):
+                marked = '{};{}={};{}'.format(line, self._batch_marker, count, pending[count])
+                if len(marked) + len(self._batch_marker) + 3 > self._line_limit:
+                    break
+                line = marked
+                count += 1
+
+            if count > 1:
+                line = '{}=0;{}'.format(self._batch_marker, line)
+
+            if self.command(line) != '-1':
+                pending = pending[count:]
+                continue
+
+            # the controller stops at the failing command, later ones are resent,
+            # the marker and error are read where the line ran
+            g = self._route(line)
+            try:
+                done = int(float(self._send(g, 'MG' + self._batch_marker))) if count > 1 else 0
+            except ValueError:
+                done = -1
+            error = self._send(g, 'TC1').strip()
+
+            if done < 0 or error == '-1':
+                # a lost connection, nothing tells which commands ran
+                log.error('No reply from controller, {} commands not sent.'.format(len(pending)))
+                errors += [(command, 'no reply') for command in pending]
+                break
+
+            done = min(done, count - 1)
+            log.error('{} failed: {}'.format(pending[done], error))
+            errors.append((pending[done], error))
+            pending = pending[done + 1:]
+
+        return errors
+
+    ##
+    # Telemetry
+    ##
+
+    def snapshot(self, axes=None, fields=None, max_age=0):
+        '''Samples fields on all axes with one command per field.'''
+        if axes is None:
+            axes = sorted(self._axes.keys())
+        axes = ''.join(axes).upper()
+
+        if fields is None:
+            fields = ('position', 'velocity', 'torque', 'error')
+
+        # prefer the data record stream while it is fresh
+        stream = self.stream
+        if stream is not None and stream.latest is not None:
+            if stream.latest.covers(axes, fields):
+                if (time.time() - stream.latest.time) < max(max_age, 5 * stream.period):
+                    return stream.latest
+
+        # share a recent snapshot instead of querying again
+        last = self._snapshot
+        if last is not None and last.covers(axes, fields):
+            if (time.time() - last.time) < max_age:
+                return last
+
+        snapshot = Snapshot(axes, fields, time.time())
+        if not axes:
+            return snapshot
+
+        for field in fields:
+            # multi-axis form replies with comma separated values, e.g. TPABC
+            values = self.command(self._telemetry[field] + axes).split(',')
+
+            if len(values) != len(axes):
+                log.error('Bad reply to {}{}.'.format(self._telemetry[field], axes))
+                values = ['nan'] * len(axes)
+
+            for axis, value in zip(axes, values):
+                snapshot.data[axis][field] = float(value)
+
+        self._snapshot = snapshot
+        if self.history is not None:
+            self.history.append(snapshot)
+        return snapshot
+
+    def startTelemetry(self, rate=100):
+        '''Starts streaming data records at rate (Hz) on a separate connection.'''
+        self.stopTelemetry()
+        self.stream = TelemetryStream(self, rate)
+        if self.history is not None:
+            self.stream.subscribe(self.history.append)
+        self.stream.start()
+
+    def stopTelemetry(self):
+        '''Stops the data record stream, snapshots fall back to polling.'''
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
+
+    ##
+    # Interrupts
+    ##
+
+    def startHistory(self, seconds=3600.0, fields=None, capacity=None):
+        '''Keeps every snapshot of the bound axes in a TelemetryHistory, needs numpy.'''
+        # sized for seconds of the stream, at its default rate if it is not running;
+        # an hour of 1 kHz records would take about 1 GB for eight axes
+        if capacity is None:
+            rate = self.stream.rate if self.stream is not None else 100
+            capacity = int(seconds * rate)
+
+        self.stopHistory()
+        try:
+            self.history = TelemetryHistory(sorted(self._axes.keys()), fields, capacity)
+        except RuntimeError as e:
+            log.warning('Telemetry history is off: {}'.format(e))
+            return False
+
+        if self.stream is not None:
+            self.stream.subscribe(self.history.append)
+        return True
+
+    def stopHistory(self):
+        if self.history is not None:
+            if self.stream is not None:
+                self.stream.unsubscribe(self.history.append)
+            self.history = None
+
+    def startMonitor(self):
+        '''Starts listening for motion complete interrupts.'''
+        self.stopMonitor()
+        self.monitor = MotionMonitor(self)
+        self.monitor.start()
+
+    def stopMonitor(self):
+        '''Stops the interrupt listener, waits fall back to polling.'''
+        if self.monitor is not None:
+            self.monitor.stop()
+            self.monitor = None
+
+    def motionComplete(self, axes=None):
+        '''Signals waiting tasks that motion completed on axes (all if None).'''
+        if axes is None:
+            axes = self._axes.keys()
+
+        for axis in axes:
+            if axis in self._axes:
+                self._axes[axis]._motion_done.set()
+
+        self.scheduler.wake()
 
     ##
     # System
@@ -69,6 +446,19 @@ class GalilController(object):
 
     def burnParameters(self):
         self.command('BN')
+        self.invalidateShadow()
+
+    def invalidateShadow(self):
+        '''Forces the next access to every axis register to reach the controller.'''
+        for axis in self._axes.values():
+            axis.invalidateShadow()
+
+    def syncParameters(self):
+        '''Reads the shadowed registers of every axis, later reads are served from the shadow.'''
+        for axis in self._axes.values():
+            axis.invalidateShadow()
+            for register in sorted(axis._shadowed):
+                axis.getData(register)
 
     def burnProgram(self):
         self.command('BP')
@@ -87,11 +477,13 @@ class GalilController(object):
 
     def begin(self):
         '''Begins motion on all axes.'''
+        for axis in self._axes.values():
+            axis._motion_done.clear()
         self.command('BG')
 
     def stop(self):
         '''Stops motion before end of move on all axes.'''
-        self.command('ST')
+        self.urgent('ST')
 
     ##
     # IO
@@ -112,35 +504,98 @@ class GalilController(object):
 
 class GalilAbstractAxis(GalilController):
 
+    # registers only the host changes, served from the shadow cache
+    _shadowed = frozenset(['BR', 'SP', 'AC', 'DC', 'JG', 'PR', 'PA', 'IT', 'KP', 'KI', 'KD', 'OF', 'IL', 'TL'])
+
+    # writes that make other shadowed registers stale, JG/PR/PA also select the motion mode
+    _invalidates = {
+        'JG': ('PR', 'PA'),
+        'PR': ('JG', 'PA'),
+        'PA': ('JG', 'PR'),
+        'DP': ('PR', 'PA')
+    }
+
     def __init__(self, axis, parent=None):
         '''Binds to a gclib instance from a GalilWrapper.'''
         self.controller = parent
         self._parent = parent
         self._g = parent._g
+        self._q = parent._q
+        self._s = parent._s
+        self._transport = parent._transport
         self._axis = axis.upper()
 
+        # register on controller for shared snapshots
+        parent._axes[self._axis] = self
+
         # vars
         self._conversion_factor = 1.0
 
+        # set by motion complete interrupts, cleared on begin
+        self._motion_done = Event()
+        self._motion_done.set()
+
+        # controller-side capture started by the next begin
+        self._capture = None
+
+        # host copy of configuration registers
+        self._shadow = {}
+        self.shadow_hits = 0
+        self.shadow_misses = 0
+
     ##
     # Methods
     ##
 
     def getData(self, command):
         '''Returns data from command on current axis.'''
-        cmd_string = command.upper() + self._axis.upper() + '=?'
+        command = command.upper()
+        if command in self._shadow:
+            self.shadow_hits += 1
+            return float(self._shadow[command])
+
+        cmd_string = command + self._axis.upper() + '=?'
         data = self.command(cmd_string)
+
+        # a failed read is not the register, the next read asks again
+        if command in self._shadowed and data != '-1':
+            self.shadow_misses += 1
+            self._shadow[command] = data
+
         return float(data)
 
     def setData(self, command, value):
         '''Sets data at command on current axis.'''
-        cmd_string = command.upper() + self._axis.upper() + '=' + str(value)
-        try:
-            self.command(cmd_string)
-        except gclib.GclibError:
+        command = command.upper()
+        value = str(value)
+
+        # skip writes the controller already holds
+        if self._shadow.get(command) == value:
+            self.shadow_hits += 1
+            return True
+
+        for register in self._invalidates.get(command, ()):
+            self._shadow.pop(register, None)
+
+        cmd_string = command + self._axis.upper() + '=' + value
+        if self.command(cmd_string) == '-1':
+            self._shadow.pop(command, None)
             return False
+
+        if command in self._shadowed:
+            self.shadow_misses += 1
+            self._shadow[command] = value
+
         return True
 
+    def invalidateShadow(self, *registers):
+        '''Drops shadowed registers (all if none given).'''
+        if registers:
+            for register in registers:
+                self._shadow.pop(register.upper(), None)
+        else:
+            self._shadow.clear()
+
     ##
     # Motion
     ##
@@ -159,7 +614,22 @@ class GalilAbstractAxis(GalilController):
 
     def begin(self):
         '''Begins motion.'''
-        self.command('BG' + self._axis)
+        self._motion_done.clear()
+
+        # recording starts on the same line, so the first record is the start of the move
+        capture, self._capture = self._capture, None
+        if capture is not None:
+            self.command('{};BG{}'.format(capture.trigger(), self._axis))
+        else:
+            self.command('BG' + self._axis)
+
+    def armCapture(self, capture):
+        '''Prepares a Capture that records from the next begin, returns True on success.'''
+        if not capture.arm():
+            return False
+
+        self._capture = capture
+        return True
 
     def stop(self):
         '''Stops motion before end of move.'''
@@ -168,11 +638,47 @@ class GalilAbstractAxis(GalilController):
     def wait(self, blocking=True):
         '''Blocks until the motion completes.'''
         if blocking:
-            while int(float(self.command('MG_BG' + self._axis))):
-                time.sleep(0.01)
+            while True:
+                # cleared before the query, an interrupt after it is not lost
+                self._motion_done.clear()
+                if not int(float(self.command('MG_BG' + self._axis))):
+                    return
+
+                if self.controller.monitor is None:
+                    time.sleep(0.01)
+                    continue
+
+                # the monitor also sets the event now and then in case an interrupt
+                # was missed, and when it stops, python 2 sleeps through timed waits
+                self._motion_done.wait()
         else:
             return int(float(self.command('MG_BG' + self._axis)))
 
+    def waitTask(self):
+        '''Returns a scheduler task that completes when the motion completes.'''
+        if self.controller.monitor is None:
+            return Poll(lambda: not self.wait(blocking=False))
+
+        def complete():
+            # re-checked when the monitor wakes the scheduler, see wait
+            self._motion_done.clear()
+            if not self.wait(blocking=False):
+                return True
+
+            # without the monitor nothing wakes the scheduler anymore
+            if self.controller.monitor is None:
+                task.interval = 0.01
+            return False
+
+        task = Poll(complete, interval=None)
+        return task
+
+    def wait_async(self):
+        '''Returns a Future that resolves when the motion completes.'''
+        future = Future()
+        self.controller.scheduler.schedule(Watch(self._axis), [self.waitTask(), (future.set_result, None)])
+        return future
+
     ##
     # Properties
     ##
@@ -183,7 +689,9 @@ class GalilAbstractAxis(GalilController):
 
     @axis.setter
     def axis(self, value):
+        self._parent._axes.pop(self._axis, None)
         self._axis = str(value).upper()
+        self._parent._axes[self._axis] = self
 
     # configuration
 
@@ -359,67 +867,114 @@ class GalilAbstractAxis(GalilController):
     def error(self):
         return float(self.command('TE' + self._axis)) / self._conversion_factor
 
+    def telemetry(self, max_age=0):
+        '''Returns position, velocity, torque and error from a controller snapshot.'''
+        data = self.controller.snapshot(max_age=max_age)[self._axis]
+
+        return {
+            'position': data['position'] / self._conversion_factor,
+            'velocity': data['velocity'] / self._conversion_factor,
+            'torque': data['torque'],
+            'error': data['error'] / self._conversion_factor
+        }
+
 
 class GalilAxis(GalilAbstractAxis):
 
+    # longest wait for the task in flight when cancelling (seconds)
+    _cancel_timeout = 0.5
+
+    # tasks that only send commands, merged into single command lines
+    _batchable_methods = frozenset(['enable', 'disable', 'begin', 'stop'])
+    _batchable_properties = frozenset([
+        'brush_mode', 'position_relative', 'position_absolute', 'speed', 'acceleration',
+        'deceleration', 'increment_position', 'time_constant', 'jog', 'kp', 'ki', 'kd',
+        'offset', 'integrator_limit', 'torque_limit'
+    ])
+
     def __init__(self, *args, **kwargs):
         super(GalilAxis, self).__init__(*args, **kwargs)
 
         self.is_homed = False
         self.home_limit = 0.0
-
-        # list of scheduled tasks
-        # items are tuples (func, (args))
-        self.tasks = []
-
-        # execute scheduler
-        sched = Thread(target=self.loop, args=())
-        sched.daemon = True
-        sched.start()
+        self.home_captures = {}         # {edge: Capture} of the last home with capture
 
     ##
     # Scheduler
     ##
 
+    @property
+    def tasks(self):
+        '''Copy of pending tasks, items are tuples (func, (args)) or Poll.'''
+        return self.controller.scheduler.tasks(self)
+
     @property
     def running(self):
-        if len(self.tasks) > 0:
+        return self.controller.scheduler.pending(self)
+
+    def schedule(self, tasks):
+        '''Compiles and queues tasks on the controller scheduler.'''
+        self.controller.scheduler.schedule(self, compileTasks(self, tasks))
+
+    def done_async(self):
+        '''Returns a Future that resolves once the tasks queued so far have run.'''
+        future = Future()
+        self.controller.scheduler.schedule(self, [Notify(future)])
+        return future
+
+    def cancel(self):
+        '''Clears task list, stops and disables axis ahead of queued commands.'''
+        scheduler = self.controller.scheduler
+        scheduler.clear(self)
+
+        line = 'ST{0};MO{0}'.format(self._axis)
+        routines = self.controller.routines
+        if routines.loaded:
+            line = 'HX{};{}'.format(routines.thread(self._axis), line)
+        self.controller.urgent(line)
+
+        # a task in flight may have started motion after the stop
+        if scheduler.pending(self) and current_thread() is not scheduler:
+            if not scheduler.waitIdle(self, self._cancel_timeout):
+                log.warning('Task still running on axis {} after cancel.'.format(self._axis))
+            self.controller.urgent(line)
+
+    def execute(self, task):
+        '''Runs one task, returns False if a Poll task has to be retried.'''
+        if isinstance(task, Poll):
+            return task()
+
+        if isinstance(task, Batch):
+            with self.recording() as commands:
+                for item in task.tasks:
+                    self.execute(item)
+
+            # registers written by a failed line may not hold their shadow value
+            if self.controller.commandBatch(commands):
+                self.invalidateShadow()
+
             return True
+
+        if len(task) == 1:
+            # execute task with no arguments
+            task[0]()
+
+        elif isinstance(task[0], str):
+            # set variable
+            if isinstance(task[1], str):
+                # from another variable
+                value = self.__getattribute__(task[1])
+            else:
+                # from immediate
+                value = task[1]
+
+            self.__setattr__(task[0], value)
+
         else:
-            return False
+            # execute task with arguments
+            task[0](*task[1:])
 
-    def cancel(self):
-        '''Clears task list and disables axis.'''
-        self.tasks = []
-        self.stop()
-        self.disable()
-
-    def loop(self):
-        '''Iterates through task list indefinitely.'''
-        while True:
-            if len(self.tasks) > 0:
-                task = self.tasks.pop(0)
-
-                if len(task) == 1:
-                    # execute task with no arguments
-                    task[0]()
-
-                elif isinstance(task[0], str):
-                    # set variable
-                    if isinstance(task[1], str):
-                        # from another variable
-                        value = self.__getattribute__(task[1])
-                    else:
-                        # from immediate
-                        value = task[1]
-
-                    self.__setattr__(task[0], value)
-
-                else:
-                    # execute task with arguments
-                    task[0](*task[1:])
-
-            time.sleep(0.01)
+        return True
 
     ##
     # Methods
@@ -432,7 +987,7 @@ class GalilAxis(GalilAbstractAxis):
             (self.enable,),
             (self.begin,)
         ]
-        self.tasks.extend(task)
+        self.schedule(task)
 
     def relativeMove(self, speed, pos):
         '''Moves to a relative position.'''
@@ -441,43 +996,70 @@ class GalilAxis(GalilAbstractAxis):
             ('speed', speed),
             (self.enable,),
             (self.begin,),
-            (self.wait,),
+            self.waitTask(),
             (self.disable,)
         ]
-        self.tasks.extend(task)
+        self.schedule(task)
 
     def timedMove(self, speed, t):
         '''Moves axis at speed for time.'''
         self.relativeMove(speed, speed * t)
 
-    def home(self, speed, torque):
-        '''Finds left and right limits.'''
+    def home(self, speed, torque, capture=False, travel=None):
+        '''Finds left and right limits, capture keeps traces of both edges in home_captures.'''
+        # travel between the edges, the last home_limit unless given, bounds the
+        # time to reach each edge and sizes the captures
+        if travel is None and self.is_homed:
+            travel = self.home_limit
+        sweep = abs(travel / float(speed)) if travel else None
+
         def blockUntilTorque(torque):
-            init_time = time.time()
-            while (abs(self.torque) < torque) and ((time.time() - init_time) < 5):
-                time.sleep(0.1)
+            return Poll(lambda: abs(self.torque) >= torque, interval=0.1, timeout=max(5, 2 * (sweep or 0)))
+
+        # each sweep is recorded on the controller at full rate into a circular
+        # buffer, halted at the torque rise so a long sweep keeps the edge, and
+        # uploaded once stopped as the next edge reuses the arrays
+        fields = ('position', 'velocity', 'torque', 'error')
+        samples = Capture.samplesFor(fields, sweep)
+
+        self.home_captures = {}
+        steps = {}
+        for edge in ('left', 'right'):
+            if capture:
+                self.home_captures[edge] = Capture(self, fields, samples, circular=True)
+                steps[edge] = ([(self.armCapture, self.home_captures[edge])],
+                               [(self.home_captures[edge].halt,)],
+                               [(self.home_captures[edge].upload,)])
+            else:
+                steps[edge] = ([], [], [])
 
         task = [
             # find left edge
             ('jog', -speed),
-            (self.enable,),
+            (self.enable,)
+        ] + steps['left'][0] + [
             (self.begin,),
-            (blockUntilTorque, torque),
+            blockUntilTorque(torque)
+        ] + steps['left'][1] + [
             (self.stop,),
-            (self.wait,),
+            self.waitTask()
+        ] + steps['left'][2] + [
             (super(GalilAxis, self).home,),
 
             # find right edge
-            ('jog', speed),
+            ('jog', speed)
+        ] + steps['right'][0] + [
             (self.begin,),
-            (blockUntilTorque, torque),
+            blockUntilTorque(torque)
+        ] + steps['right'][1] + [
             (self.stop,),
-            (self.wait,),
+            self.waitTask()
+        ] + steps['right'][2] + [
             (self.disable,),
             ('home_limit', 'position'),
             ('homed', True)
         ]
-        self.tasks.extend(task)
+        self.schedule(task)
 
     def absoluteMove(self, speed, pos):
         '''Moves to an absolute position from home.'''
@@ -487,33 +1069,65 @@ class GalilAxis(GalilAbstractAxis):
                 ('speed', speed),
                 (self.enable,),
                 (self.begin,),
-                (self.wait,)
+                self.waitTask()
             ]
-            self.tasks.extend(task)
+            self.schedule(task)
 
     def rangeMove(self, speed, pos):
         '''Moves within ranges found by homing.'''
         if self.is_homed:
+            routines = self.controller.routines
+            if routines.available:
+                task = [
+                    (routines.start, self, 'RG', {
+                        'rgs': speed * self._conversion_factor,
+                        'rgp': self.home_limit * pos * self._conversion_factor
+                    }),
+                    routines.waitTask(self)
+                ]
+                self.schedule(task)
+                return
+
             task = [
                 ('position_absolute', self.home_limit * pos),
                 ('speed', speed),
                 (self.enable,),
                 (self.begin,),
-                (self.wait,)
+                self.waitTask()
             ]
-            self.tasks.extend(task)
+            self.schedule(task)
 
     def pingPong(self, speed, repeats, a, b):
         '''Bounces between positions.'''
         if self.is_homed:
+            routines = self.controller.routines
+            if routines.available and repeats > 0:
+                # the bouncing loop runs on the controller
+                task = [
+                    (routines.start, self, 'PP', {
+                        'pps': speed * self._conversion_factor,
+                        'ppa': self.home_limit * a * self._conversion_factor,
+                        'ppb': self.home_limit * b * self._conversion_factor,
+                        'ppc': repeats
+                    }),
+                    routines.waitTask(self)
+                ]
+                self.schedule(task)
+                return
+
             task = [(self.enable,), ('speed', speed)]
             for i in range(repeats):
                 task.append(('position_absolute', self.home_limit * a))
                 task.append((self.begin,))
-                task.append((self.wait,))
+                task.append(self.waitTask())
                 task.append(('position_absolute', self.home_limit * b))
                 task.append((self.begin,))
-                task.append((self.wait,))
+                task.append(self.waitTask())
 
             task.append((self.disable,))
-            self.tasks.extend(task)
+            self.schedule(task)
+
+    @property
+    def strokes(self):
+        '''Strokes completed by the running pingPong routine.'''
+        return self.controller.routines.progress(self)
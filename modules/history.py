@@ -0,0 +1,103 @@
+from threading import Lock
+from .clock import monotonic
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TelemetryHistory(object):
+
+    # fields kept unless others are given
+    _fields = ('position', 'velocity', 'torque', 'error')
+
+    # fields stored wider than dtype, counts past 2**24 round in float32 (see RunRecorder)
+    _dtypes = {'position': 'float64', 'error': 'float64'}
+
+    def __init__(self, axes, fields=None, capacity=2 ** 17, dtype='float32'):
+        '''Fixed memory history of telemetry, one ring buffer per axis and field.'''
+        if np is None:
+            raise RuntimeError('numpy is required for telemetry history.')
+
+        self.axes = ''.join(axes).upper()
+        self.fields = tuple(fields or self._fields)
+        self.capacity = capacity
+        self.count = 0                  # samples appended since creation
+
+        # every ring is stored twice back to back, so the newest n samples are
+        # always one contiguous slice and windows are views, never copies
+        self.time = np.zeros(2 * capacity)
+        self.data = dict(((axis, field), np.full(2 * capacity, np.nan, dtype=self._dtypes.get(field, dtype)))
+                         for axis in self.axes for field in self.fields)
+
+        self._lock = Lock()             # serializes writers, readers never lock
+
+    ##
+    # Writing
+    ##
+
+    def append(self, snapshot, timestamp=None):
+        '''Adds a Snapshot as one sample, missing axes and fields are stored as NaN.'''
+        if timestamp is None:
+            timestamp = monotonic()
+
+        with self._lock:
+            i = self.count % self.capacity
+            j = i + self.capacity
+
+            for (axis, field), ring in self.data.items():
+                value = snapshot.data.get(axis, {}).get(field, np.nan)
+                ring[i] = ring[j] = value
+
+            self.time[i] = self.time[j] = timestamp
+
+            # publish after the values are in place
+            self.count += 1
+
+    def clear(self):
+        with self._lock:
+            self.count = 0
+
+    ##
+    # Reading
+    ##
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def _slice(self, n):
+        '''Returns the slice of the newest n samples in the doubled buffers.'''
+        count = self.count
+        n = min(len(self) if n is None else n, count, self.capacity)
+        end = (count - 1) % self.capacity + self.capacity + 1
+        return slice(end - n, end)
+
+    def times(self, n=None):
+        '''Returns a view of the timestamps of the newest n samples, oldest first.'''
+        return self.time[self._slice(n)]
+
+    def series(self, axis, field, n=None):
+        '''Returns a view of the newest n values of field on axis, oldest first.'''
+        return self.data[(axis.upper(), field)][self._slice(n)]
+
+    def window(self, seconds, fields=None, axes=None):
+        '''Returns (times, {(axis, field): values}) of the last seconds as views.'''
+        # one slice for every column, the count may grow while reading
+        window = self._slice(None)
+        times = self.time[window]
+
+        start = int(np.searchsorted(times, times[-1] - seconds)) if len(times) else 0
+        window = slice(window.start + start, window.stop)
+
+        axes = (axes or self.axes).upper()
+        fields = fields or self.fields
+        return self.time[window], dict(((axis, field), self.data[(axis, field)][window])
+                                       for axis in axes for field in fields)
+
+    def duration(self):
+        '''Returns the seconds the full ring holds at the recent sample rate, None before two samples.'''
+        times = self.times()
+        if len(times) < 2:
+            return None
+        return (times[-1] - times[0]) / (len(times) - 1) * self.capacity
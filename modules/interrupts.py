@@ -0,0 +1,93 @@
+from threading import Thread, Event
+from .transport import GclibError
+from .clock import monotonic
+import logging as log
+
+
+class MotionMonitor(Thread):
+
+    # interrupt status bytes, 0xD0 + n is motion complete on axis n (A-H)
+    _axis_complete = 0xD0
+    _all_complete = 0xC8
+
+    # 0xF0 + n is user interrupt n, sent by routines when thread n ends
+    _user = 0xF0
+
+    # EI mask enabling motion complete interrupts on axes A-H
+    _mask = 0xFF
+
+    # interrupt wait before checking for stop, also the period of motion
+    # checks in case an interrupt was missed (seconds)
+    _timeout = 0.5
+
+    # pause after a wait that failed before its timeout, doubled while failures repeat (seconds)
+    _retry_min = 0.01
+    _retry_max = 1.0
+
+    def __init__(self, controller):
+        '''Listens for motion complete interrupts on a dedicated connection.'''
+        super(MotionMonitor, self).__init__()
+        self.daemon = True
+
+        self.controller = controller
+        self._stopping = Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        try:
+            self.listen()
+        finally:
+            # waits fall back to polling, also when the listener failed
+            if self.controller.monitor is self:
+                self.controller.monitor = None
+            self.controller.motionComplete()
+
+    def listen(self):
+        '''Dispatches interrupts until stopped or the connection fails to open.'''
+        g = self.controller._transport()
+        try:
+            g.GOpen('-a {} --direct -s EI'.format(self.controller.address))
+            g.GTimeout(int(self._timeout * 1000))
+            g.GCommand('EI{}'.format(self._mask))
+        except GclibError:
+            log.warning('Interrupts unavailable at ({}).'.format(self.controller.address))
+            return
+
+        retry = 0
+        checked = monotonic()
+        while not self._stopping.is_set():
+            # waiters block until told, they query the axes again now and then
+            started = monotonic()
+            if started - checked >= self._timeout:
+                checked = started
+                self.controller.motionComplete()
+
+            try:
+                status = g.GInterrupt()
+            except GclibError:
+                # a timeout only checks for stop, a dropped link fails at once
+                if monotonic() - started >= self._timeout / 2:
+                    retry = 0
+                else:
+                    retry = min(self._retry_max, max(self._retry_min, retry * 2))
+                    self._stopping.wait(retry)
+                continue
+
+            retry = 0
+
+            if self._axis_complete <= status < self._axis_complete + 8:
+                self.controller.motionComplete(chr(ord('A') + status - self._axis_complete))
+
+            elif status == self._all_complete:
+                self.controller.motionComplete()
+
+            elif self._user <= status < self._user + 16:
+                self.controller.routines.userInterrupt(status - self._user)
+
+        try:
+            g.GCommand('EI0')
+            g.GClose()
+        except GclibError:
+            pass
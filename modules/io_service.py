@@ -0,0 +1,109 @@
+from threading import Thread, Condition
+from collections import deque
+from .futures import Future
+from .clock import monotonic
+import logging as log
+
+
+class IOService(Thread):
+
+    # shortest time between two latest-value writes of the same key (seconds)
+    _latest_period = 0.1
+
+    def __init__(self, controller):
+        '''Runs blocking controller calls for the GUI in order, one worker per controller.'''
+        super(IOService, self).__init__()
+        self.daemon = True
+
+        self.controller = controller
+        self.coalesced = 0              # calls answered by a pending call
+
+        self._cond = Condition()
+        self._queue = deque()           # [key, future, func, args, due]
+        self._reads = {}                # queued reads by key
+        self._latest = {}               # queued latest-value writes by key
+        self._sent = {}                 # when each latest-value key last ran
+        self._stopping = False
+
+    def read(self, key, func, *args):
+        '''Queues func(*args), a read with the same key still queued is shared.'''
+        with self._cond:
+            entry = self._reads.get(key)
+            if entry is not None:
+                self.coalesced += 1
+                return entry[1]
+
+            entry = self._reads[key] = [key, Future(), func, args, 0]
+            self._queue.append(entry)
+            self._cond.notify()
+            return entry[1]
+
+    def write(self, func, *args):
+        '''Queues func(*args), writes always run and keep their order.'''
+        future = Future()
+        with self._cond:
+            self._queue.append([None, future, func, args, 0])
+            self._cond.notify()
+        return future
+
+    def latest(self, key, func, *args):
+        '''Queues func(*args) in place of a queued call of key, at most once per period.'''
+        with self._cond:
+            entry = self._latest.get(key)
+            if entry is not None:
+                # only the newest value is sent
+                self.coalesced += 1
+                entry[2], entry[3] = func, args
+                return entry[1]
+
+            due = self._sent.get(key, 0) + self._latest_period
+            entry = self._latest[key] = [key, Future(), func, args, due]
+            self._queue.append(entry)
+            self._cond.notify()
+            return entry[1]
+
+    def stop(self):
+        '''Ends the worker after the call it is running, queued calls never run.'''
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _next(self):
+        '''Returns the first queued call that is due, waits for one otherwise, None once stopped.'''
+        while not self._stopping:
+            now = monotonic()
+            for entry in self._queue:
+                if entry[4] <= now:
+                    self._queue.remove(entry)
+                    return entry
+
+            if self._queue:
+                self._cond.wait(min(entry[4] for entry in self._queue) - now)
+            else:
+                self._cond.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                entry = self._next()
+                if entry is None:
+                    return
+                key, future, func, args, due = entry
+
+                # later calls of key need a new result
+                if self._reads.get(key) is entry:
+                    del self._reads[key]
+                if self._latest.get(key) is entry:
+                    del self._latest[key]
+                    self._sent[key] = monotonic()
+
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                log.exception('I/O call {} failed.'.format(getattr(func, '__name__', func)))
+                future.set_exception(e)
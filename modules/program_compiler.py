@@ -0,0 +1,92 @@
+import logging as log
+
+
+def _number(value):
+    return '{:.4f}'.format(value)
+
+
+def _action(axis, action, args):
+    '''Returns DMC lines for one recipe row, mirroring ProgramThread.execute.'''
+    a = axis.axis
+    cf = axis.conversion_factor
+
+    if action == 'Timed':
+        # relative move of speed * duration, then disable
+        speed = args[0]
+        duration = args[1] / 1000.0
+        return [
+            'PR{}={}'.format(a, _number(speed * duration * cf)),
+            'SP{}={}'.format(a, _number(speed * cf)),
+            'SH{}'.format(a),
+            'BG{}'.format(a),
+            'AM{}'.format(a),
+            'MO{}'.format(a)
+        ]
+
+    if not axis.is_homed:
+        log.warning('{} on unhomed axis {} skipped.'.format(action, a))
+        return []
+
+    if action == 'Range':
+        position = args[1] / 100.0
+        return [
+            'PA{}={}'.format(a, _number(axis.home_limit * position * cf)),
+            'SP{}={}'.format(a, _number(args[0] * cf)),
+            'SH{}'.format(a),
+            'BG{}'.format(a),
+            'AM{}'.format(a)
+        ]
+
+    if action == 'PingPong':
+        # the routine makes one stroke pair before checking the count
+        if args[2] <= 0:
+            return []
+
+        # parameters of the resident #PP routine, see RoutineLibrary
+        stroke = args[1]
+        return [
+            'pps{}={}'.format(a, _number(args[0] * cf)),
+            'ppa{}={}'.format(a, _number(axis.home_limit * (0.5 - (stroke / 200.0)) * cf)),
+            'ppb{}={}'.format(a, _number(axis.home_limit * (0.5 + (stroke / 200.0)) * cf)),
+            'ppc{}={}'.format(a, args[2]),
+            'JS#PP{}'.format(a)
+        ]
+
+    return []
+
+
+def compileProgram(axes, program):
+    '''Returns {controller: (source, {axis letter: thread})} running program.'''
+    # every axis thread waits for its rows with AT, relative to the AT0
+    # reference taken when it starts, and stores the index of the row it
+    # dispatches in its own controller variable rpc{axis}
+    program = sorted(program, key=lambda k: k['time'])
+
+    # rows of each axis, with their index in the sorted program
+    rows = {}
+    for index, task in enumerate(program):
+        rows.setdefault(task['axis'], []).append((index, task))
+
+    programs = {}
+    for name in sorted(rows.keys()):
+        axis = axes[name]
+        controller = axis.controller
+        thread = controller.routines.thread(axis.axis)
+
+        lines = ['#RC{}'.format(axis.axis), 'AT0']
+        for index, task in rows[name]:
+            # AT0 would reset the reference, rows at time 0 need no wait
+            if int(task['time']) > 0:
+                lines.append('AT{}'.format(int(task['time'])))
+            lines.append('rpc{}={}'.format(axis.axis, index))
+            lines.extend(_action(axis, task['action'], task['args']))
+        lines.append('EN')
+
+        source, threads = programs.setdefault(controller, ([], {}))
+        source.extend(lines)
+        threads[axis.axis] = thread
+
+    return dict(
+        (controller, (controller.routines.program() + '\n'.join(source) + '\n', threads))
+        for controller, (source, threads) in programs.items()
+    )
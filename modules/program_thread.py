@@ -1,5 +1,10 @@
 from PyQt4 import QtCore
-import time
+from threading import Event
+from .program_compiler import compileProgram
+from .dispatch_stats import DispatchStats
+from .clock import monotonic
+import logging as log
+import heapq
 
 
 class ProgramThread(QtCore.QThread):
@@ -21,6 +26,15 @@ class ProgramThread(QtCore.QThread):
         self.loop = 0           # current loop iteration
         self.pc = 0             # program counter
 
+        # dispatch lateness of the current run
+        self.stats = DispatchStats()
+
+        # optional RunRecorder of dispatched rows
+        self.recorder = None
+
+        # interrupts waits when stopping
+        self._wake = Event()
+
     def execute(self, axis, action, args):
         axis = self.axes[axis]
 
@@ -47,51 +61,186 @@ class ProgramThread(QtCore.QThread):
             axis.pingPong(speed, repeats, a, b)
 
     def stop(self):
+        '''Wakes the dispatch loop, which halts the axes on its way out.'''
         self.running = False
+        self._wake.set()
+
+    def waitIdle(self):
+        '''Blocks until all axes finish execution or the program stops.'''
+        for axis in self.axes.values():
+            while self.running and not axis.controller.scheduler.waitIdle(axis, 0.1):
+                pass
 
     def run(self):
         self.running = True
         self.loop = 0
         self.pc = 0
+        self.stats = DispatchStats()
+        self._wake.clear()
 
-        start = time.time() * 1000.0
-        while self.running:
-            self.elapsed = (time.time() * 1000.0) - start
-            task = self.program[self.pc]
+        while self.running and self.program:
+            # deadlines are absolute from the start of the iteration, so
+            # late rows never delay the rows after them
+            start = monotonic()
+            deadlines = [(start + task['time'] / 1000.0, index) for index, task in enumerate(self.program)]
+            heapq.heapify(deadlines)
+
+            while deadlines and self.running:
+                due, index = deadlines[0]
 
-            if self.elapsed > task['time']:
+                # sleep until the next row is due
+                remaining = due - monotonic()
+                if remaining > 0:
+                    self._wake.wait(remaining)
+                    continue
+
+                heapq.heappop(deadlines)
+                task = self.program[index]
+
+                self.stats.record(due - start, monotonic() - start, index)
                 self.execute(task['axis'], task['action'], task['args'])
+
+                if self.recorder is not None:
+                    self.recorder.event(task['axis'], task['action'], task['args'], self.loop, index)
+
+                self.elapsed = (monotonic() - start) * 1000.0
+                self.pc = index
                 self.instruction_changed.emit(self.pc)
-                self.pc += 1
 
-            if self.pc == len(self.program):
-                # wait until all axes finish execution:
-                for axis in self.axes.values():
-                    while axis.running and self.running:
-                        time.sleep(0.01)
-                        pass
+            # wait until all axes finish execution
+            self.waitIdle()
 
-                start = time.time() * 1000.0
-                self.loop += 1
-                self.pc = 0
-                self.iteration_changed.emit(self.loop)
+            if not self.running:
+                break
+
+            self.loop += 1
+            self.pc = 0
+            self.iteration_changed.emit(self.loop)
 
             if not self.loops == 0 and self.loop == self.loops:
                 break
 
-            time.sleep(0.01)
+        log.info('Dispatch lateness (s): {}'.format(self.stats.summary()))
 
         # stop all axis
         for axis in self.axes.values():
             axis.cancel()
 
 
+class CompiledProgramThread(ProgramThread):
+
+    # period of progress and completion queries
+    _progress_rate = 0.05
+
+    def __init__(self, *args, **kwargs):
+        super(CompiledProgramThread, self).__init__(*args, **kwargs)
+        self.programs = {}              # {controller: (source, {axis: thread})}
+
+    def compile(self):
+        '''Downloads the compiled recipe, returns False if a controller refused it.'''
+        self.programs = compileProgram(self.axes, self.program)
+
+        for controller, (source, threads) in self.programs.items():
+            if not controller.routines.download(source):
+                return False
+
+        return True
+
+    def compiledAxes(self):
+        '''Returns the axes that run rows of the compiled program.'''
+        return [axis for axis in self.axes.values()
+                if axis.axis in self.programs.get(axis.controller, ('', {}))[1]]
+
+    def threadsRunning(self, controller, threads):
+        reply = controller.command('MG' + ','.join('_XQ{}'.format(t) for t in threads.values()))
+        try:
+            return any(float(value) >= 0 for value in reply.split())
+        except ValueError:
+            return False
+
+    def progress(self, controller, threads):
+        '''Returns {axis: index of the last row it dispatched} of the axes in threads.'''
+        letters = sorted(threads.keys())
+        reply = controller.command('MG' + ','.join('rpc' + a for a in letters))
+        try:
+            return dict(zip(letters, [int(float(value)) for value in reply.split()]))
+        except ValueError:
+            return {}
+
+    def track(self, rows, dispatched):
+        '''Records the rows dispatched since the last progress query.'''
+        for controller, (source, threads) in self.programs.items():
+            for letter, pc in sorted(self.progress(controller, threads).items()):
+                key = (controller, letter)
+                if pc <= dispatched[key]:
+                    continue
+
+                # rows of an axis between two queries were dispatched in order
+                if self.recorder is not None:
+                    for index in rows[key]:
+                        if dispatched[key] < index <= pc:
+                            task = self.program[index]
+                            self.recorder.event(task['axis'], task['action'], task['args'], self.loop, index)
+
+                dispatched[key] = pc
+                if pc > self.pc:
+                    self.pc = pc
+                    self.instruction_changed.emit(pc)
+
+    def run(self):
+        if not self.compile():
+            log.error('Program download failed, running from the host.')
+            return super(CompiledProgramThread, self).run()
+
+        self.running = True
+        self.loop = 0
+        self.pc = 0
+        self._wake.clear()
+
+        # rows of every axis thread, axes of several controllers may share a letter
+        rows = {}
+        for index, task in enumerate(self.program):
+            axis = self.axes[task['axis']]
+            rows.setdefault((axis.controller, axis.axis), []).append(index)
+
+        while self.running:
+            # iterations start together on every controller, rows are timed on the controllers
+            for controller, (source, threads) in self.programs.items():
+                commands = ['rpc{}=-1'.format(a) for a in sorted(threads.keys())]
+                commands += ['XQ#RC{},{}'.format(a, t) for a, t in sorted(threads.items())]
+                controller.commandBatch(commands)
 
+            for axis in self.compiledAxes():
+                axis.invalidateShadow()
 
+            dispatched = dict((key, -1) for key in rows.keys())
+            self.pc = -1
+            while self.running:
+                # progress read after the threads ended covers their last rows
+                running = any(self.threadsRunning(c, t) for c, (s, t) in self.programs.items())
+                self.track(rows, dispatched)
 
+                if not running:
+                    break
 
+                self._wake.wait(self._progress_rate)
 
+            if not self.running:
+                break
 
+            self.loop += 1
+            self.pc = 0
+            self.iteration_changed.emit(self.loop)
 
+            if not self.loops == 0 and self.loop == self.loops:
+                break
 
+        # halt program threads ahead of queued commands and stop all axis
+        for controller, (source, threads) in self.programs.items():
+            controller.urgent(';'.join('HX{}'.format(t) for t in sorted(threads.values())))
 
+        for axis in self.compiledAxes():
+            axis.invalidateShadow()
+
+        for axis in self.axes.values():
+            axis.cancel()
@@ -0,0 +1,304 @@
+from threading import Thread, Lock
+from collections import OrderedDict
+from .clock import monotonic
+import logging as log
+import json
+import time
+import os
+import re
+
+try:
+    from queue import Queue, Full, Empty
+except ImportError:
+    from Queue import Queue, Full, Empty
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_unsafe = re.compile(r'[^\w.-]+')
+
+
+def _replace(source, target):
+    '''Renames source over target, readers see either file whole.'''
+    try:
+        os.replace(source, target)
+    except AttributeError:
+        # python 2 cannot rename over a file on windows
+        if os.name == 'nt' and os.path.exists(target):
+            os.remove(target)
+        os.rename(source, target)
+
+
+class _Table(object):
+
+    def __init__(self, name, columns, rows):
+        '''Column buffers of one table, filled in place until handed to the writer.'''
+        self.name = name
+        self.stem = _unsafe.sub('_', name)
+        self.columns = OrderedDict((column, np.dtype(dtype)) for column, dtype in columns)
+        self.rows = rows
+        self.chunks = []                # rows of every chunk on disk
+        self.queued = 0                 # chunks handed to the writer
+        self.fresh()
+
+    def fresh(self):
+        self.buffers = [np.empty(self.rows, dtype) for dtype in self.columns.values()]
+        self.count = 0
+        self.started = monotonic()
+
+
+class RunRecorder(Thread):
+
+    # rows per chunk file
+    _chunk_rows = 2 ** 16
+
+    # full chunks waiting for the disk, newer chunks are dropped beyond this
+    _max_pending = 32
+
+    # longest time rows wait in memory before a short chunk is written (seconds)
+    _flush_period = 10.0
+
+    # telemetry fields recorded unless others are given
+    _fields = ('position', 'velocity', 'torque', 'error', 'moving')
+
+    # position counts exceed the exact range of float32
+    _dtypes = {'position': 'float64', 'error': 'float64'}
+
+    # dispatch event columns, names are ids into the manifest's name table
+    _events = (('time', 'float64'), ('axis', 'int32'), ('action', 'int32'), ('loop', 'int32'), ('row', 'int32'),
+               ('arg0', 'float64'), ('arg1', 'float64'), ('arg2', 'float64'))
+
+    def __init__(self, path, fields=None, chunk_rows=None):
+        '''Streams telemetry and dispatch events of a run to chunked .npy columns under path.'''
+        if np is None:
+            raise RuntimeError('numpy is required for run recording.')
+
+        super(RunRecorder, self).__init__()
+        self.daemon = True
+
+        self.path = path
+        self.fields = tuple(fields or self._fields)
+        self.chunk_rows = chunk_rows or self._chunk_rows
+        self.dropped = 0                # rows lost because the disk fell behind
+        self.started = time.time()
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        self._lock = Lock()             # guards buffers and tables
+        self._queue = Queue(self._max_pending)
+        self._tables = OrderedDict()
+        self._names = []
+        self._subscriptions = []        # (stream, callback)
+        self._closed = False
+
+        self.addTable('events', self._events)
+        self._writeManifest()
+
+    ##
+    # Tables
+    ##
+
+    def addTable(self, name, columns):
+        '''Adds a table of (column, dtype) pairs.'''
+        with self._lock:
+            self._tables[name] = _Table(name, columns, self.chunk_rows)
+
+    def append(self, name, row):
+        '''Adds one row of values in column order, never waits for the disk.'''
+        with self._lock:
+            table = self._tables[name]
+            i = table.count
+            for buffer, value in zip(table.buffers, row):
+                buffer[i] = value
+            table.count += 1
+
+            if table.count == table.rows:
+                self._flush(table)
+
+    def _flush(self, table):
+        '''Hands the filled part of table to the writer, call with the lock held.'''
+        if not table.count:
+            return
+
+        chunk = (table, table.queued, [buffer[:table.count] for buffer in table.buffers])
+        try:
+            self._queue.put_nowait(chunk)
+            table.queued += 1
+        except Full:
+            self.dropped += table.count
+            log.warning('Run recording fell behind, dropped {} rows of {}.'.format(table.count, table.name))
+
+        table.fresh()
+
+    def intern(self, name):
+        '''Returns the id of name in the manifest's name table.'''
+        with self._lock:
+            if name not in self._names:
+                self._names.append(name)
+            return self._names.index(name)
+
+    ##
+    # Sources
+    ##
+
+    def attach(self, axes):
+        '''Records telemetry of every axis in {name: GalilAxis} from its controller's stream.'''
+        columns = [('time', 'float64')] + [(field, self._dtypes.get(field, 'float32')) for field in self.fields]
+
+        by_controller = OrderedDict()
+        for name, axis in sorted(axes.items()):
+            self.addTable('telemetry/' + name, columns)
+            by_controller.setdefault(axis.controller, []).append(('telemetry/' + name, axis.axis))
+
+        for controller, tables in by_controller.items():
+            stream = controller.stream
+            if stream is None:
+                log.warning('No telemetry stream, recording dispatch events only for {}.'.format(
+                    ', '.join(table for table, letter in tables)))
+                continue
+
+            callback = lambda snapshot, tables=tables: self._sample(snapshot, tables)
+            stream.subscribe(callback)
+            self._subscriptions.append((stream, callback))
+
+    def _sample(self, snapshot, tables):
+        nan = float('nan')
+        for table, letter in tables:
+            values = snapshot.data.get(letter, {})
+            self.append(table, [snapshot.time] + [values.get(field, nan) for field in self.fields])
+
+    def event(self, axis, action, args=(), loop=0, row=0, timestamp=None):
+        '''Records one dispatched program row.'''
+        if timestamp is None:
+            timestamp = time.time()
+
+        args = (list(args) + [float('nan')] * 3)[:3]
+        self.append('events', [timestamp, self.intern(axis), self.intern(action), loop, row] + args)
+
+    ##
+    # Writer
+    ##
+
+    def _writeManifest(self):
+        with self._lock:
+            manifest = {
+                'version': 1,
+                'started': self.started,
+                'closed': self._closed,
+                'dropped': self.dropped,
+                'names': list(self._names),
+                'tables': OrderedDict((table.name, {
+                    'stem': table.stem,
+                    'columns': [[column, dtype.str] for column, dtype in table.columns.items()],
+                    'chunks': list(table.chunks)}) for table in self._tables.values())
+            }
+
+        path = os.path.join(self.path, 'manifest.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=1)
+        _replace(path + '.tmp', path)
+
+    def _write(self, chunk):
+        table, index, buffers = chunk
+        for column, buffer in zip(table.columns, buffers):
+            np.save(os.path.join(self.path, _chunkName(table.stem, column, index)), buffer)
+
+        # chunks are only visible to readers once complete
+        with self._lock:
+            table.chunks.append(len(buffers[0]))
+        self._writeManifest()
+
+    def run(self):
+        while True:
+            try:
+                chunk = self._queue.get(timeout=self._flush_period / 2)
+            except Empty:
+                chunk = False
+
+            if chunk is None:
+                break
+            if chunk:
+                self._write(chunk)
+
+            # rows of slow tables reach the disk within the flush period
+            with self._lock:
+                now = monotonic()
+                for table in self._tables.values():
+                    if table.count and now - table.started >= self._flush_period:
+                        self._flush(table)
+
+    def close(self):
+        '''Detaches from the streams and writes all buffered rows.'''
+        for stream, callback in self._subscriptions:
+            stream.unsubscribe(callback)
+        self._subscriptions = []
+
+        # the last chunks may wait for the disk, nothing is moving now
+        with self._lock:
+            pending = [table for table in self._tables.values() if table.count]
+            chunks = [(table, table.queued, [buffer[:table.count] for buffer in table.buffers]) for table in pending]
+            for table in pending:
+                table.queued += 1
+                table.fresh()
+
+        if self.is_alive():
+            for chunk in chunks:
+                self._queue.put(chunk)
+            self._queue.put(None)
+            self.join()
+        else:
+            while not self._queue.empty():
+                self._write(self._queue.get())
+            for chunk in chunks:
+                self._write(chunk)
+
+        self._closed = True
+        self._writeManifest()
+
+
+def _chunkName(stem, column, index):
+    return '{}.{}.{:06d}.npy'.format(stem, column, index)
+
+
+class Run(object):
+
+    def __init__(self, path):
+        '''Reads a recording, also while it is still being written.'''
+        self.path = path
+        self.refresh()
+
+    def refresh(self):
+        '''Loads the manifest again to see chunks written since.'''
+        with open(os.path.join(self.path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        self.names = self.manifest['names']
+
+    @property
+    def tables(self):
+        return list(self.manifest['tables'].keys())
+
+    def rows(self, table):
+        return sum(self.manifest['tables'][table]['chunks'])
+
+    def chunks(self, table, column):
+        '''Returns the chunks of column as read only memory maps.'''
+        info = self.manifest['tables'][table]
+        return [np.load(os.path.join(self.path, _chunkName(info['stem'], column, i)), mmap_mode='r')
+                for i in range(len(info['chunks']))]
+
+    def column(self, table, column):
+        '''Returns column as one array, a copy unless it fits one chunk.'''
+        chunks = self.chunks(table, column)
+        if len(chunks) == 1:
+            return chunks[0]
+        if not chunks:
+            dtype = dict(self.manifest['tables'][table]['columns'])[column]
+            return np.empty(0, dtype=dtype)
+        return np.concatenate(chunks)
+
+    def name(self, index):
+        return self.names[index]
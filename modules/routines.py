@@ -0,0 +1,152 @@
+from threading import Event
+from .scheduler import Poll
+from .clock import monotonic
+from .transport import GclibError
+import logging as log
+
+
+# bounce between ppa and ppb ppc times at speed pps, ppn counts strokes
+_ping_pong = '''#PP{axis}
+SH{axis}
+SP{axis}=pps{axis}
+ppn{axis}=0
+#PL{axis}
+PA{axis}=ppa{axis}
+BG{axis}
+AM{axis}
+PA{axis}=ppb{axis}
+BG{axis}
+AM{axis}
+ppn{axis}=ppn{axis}+1
+JP#PL{axis},ppn{axis}<ppc{axis}
+MO{axis}
+UI{thread}
+EN
+'''
+
+# absolute move to rgp at speed rgs
+_range = '''#RG{axis}
+SH{axis}
+SP{axis}=rgs{axis}
+PA{axis}=rgp{axis}
+BG{axis}
+AM{axis}
+UI{thread}
+EN
+'''
+
+
+class RoutineLibrary(object):
+
+    # routines by name, formatted for every axis of the controller
+    _routines = {
+        'PP': _ping_pong,
+        'RG': _range
+    }
+
+    # fallback polling period while waiting on a user interrupt
+    _interrupt_timeout = 0.5
+
+    def __init__(self, controller):
+        '''Motion routines that run on the controller, one thread per axis.'''
+        self.controller = controller
+        self.enabled = True             # use routines once downloaded
+        self.loaded = False             # downloaded on this connection
+
+        # set by the user interrupt (UI) at the end of each routine
+        self._done = dict((thread, Event()) for thread in range(8))
+
+    ##
+    # Program
+    ##
+
+    @staticmethod
+    def thread(axis):
+        '''Returns the program thread that runs routines for axis.'''
+        return ord(axis.upper()) - ord('A')
+
+    def program(self):
+        '''Returns DMC source of every routine for every bound axis.'''
+        lines = []
+        for axis in sorted(self.controller._axes.keys()):
+            for name in sorted(self._routines.keys()):
+                lines.append(self._routines[name].format(axis=axis, thread=self.thread(axis)))
+
+        return ''.join(lines)
+
+    def download(self, program=None):
+        '''Downloads the routines, returns True on success.'''
+        if program is None:
+            program = self.program()
+
+        g = self.controller._g
+        try:
+            with g.lock:
+                g.GProgramDownload(program, '')
+        except (GclibError, AttributeError):
+            log.warning('Routine download failed, moves run from the host.')
+            self.loaded = False
+            return False
+
+        self.loaded = True
+        return True
+
+    @property
+    def available(self):
+        return self.enabled and self.loaded
+
+    ##
+    # Execution
+    ##
+
+    def start(self, axis, name, params):
+        '''Sets routine parameters and starts it in the thread of axis.'''
+        letter = axis.axis
+        thread = self.thread(letter)
+        commands = ['{}{}={:.4f}'.format(key, letter, value) for key, value in sorted(params.items())]
+        commands.append('XQ#{}{},{}'.format(name, letter, thread))
+
+        self._done[thread].clear()
+        self.controller.commandBatch(commands)
+
+        # the routine writes registers behind the shadow cache
+        axis.invalidateShadow()
+
+    def halt(self, axis):
+        '''Stops the routine running for axis.'''
+        if self.loaded:
+            self.controller.urgent('HX{}'.format(self.thread(axis.axis)))
+
+    def running(self, axis):
+        '''Returns True while a routine runs for axis.'''
+        return float(self.controller.command('MG_XQ{}'.format(self.thread(axis.axis)))) >= 0
+
+    def progress(self, axis, counter='ppn'):
+        '''Returns a progress counter of the routine, e.g. completed strokes.'''
+        return float(self.controller.command('MG{}{}'.format(counter, axis.axis)))
+
+    def userInterrupt(self, thread):
+        '''Signals that the routine in thread finished.'''
+        if thread in self._done:
+            self._done[thread].set()
+            self.controller.scheduler.wake()
+
+    def waitTask(self, axis):
+        '''Returns a scheduler task that completes when the routine of axis ends.'''
+        done = self._done[self.thread(axis.axis)]
+
+        if self.controller.monitor is None:
+            return Poll(lambda: not self.running(axis), interval=0.05)
+
+        checked = [monotonic()]
+
+        def complete():
+            # query once the interrupt arrived, or now and then in case it was missed
+            now = monotonic()
+            if not done.is_set() and (now - checked[0]) < self._interrupt_timeout:
+                return False
+
+            checked[0] = now
+            return not self.running(axis)
+
+        return Poll(complete, interval=self._interrupt_timeout)
@@ -0,0 +1,209 @@
+from threading import Thread, Condition
+from collections import deque
+from .clock import monotonic
+from .futures import Cancelled
+import logging as log
+import heapq
+import itertools
+
+
+class Poll(object):
+
+    def __init__(self, condition, interval=0.01, timeout=None):
+        '''Task that is retried every interval until condition returns True, only on wake() if None.'''
+        self.condition = condition
+        self.interval = interval        # seconds between checks
+        self.timeout = timeout          # give up after seconds, None waits forever
+
+        self._started = None
+
+    def __call__(self):
+        '''Returns True once the condition holds or the timeout expires.'''
+        if self._started is None:
+            self._started = monotonic()
+
+        if self.condition():
+            return True
+
+        if self.timeout is not None:
+            return (monotonic() - self._started) >= self.timeout
+
+        return False
+
+
+class Notify(Poll):
+
+    def __init__(self, future, value=None):
+        '''Task that resolves future when its queue reaches it.'''
+        super(Notify, self).__init__(lambda: future.set_result(value) or True)
+        self.future = future
+
+    def cancel(self):
+        '''Called when the task is dropped from its queue.'''
+        if not self.future.done():
+            self.future.set_exception(Cancelled())
+
+
+class Watch(object):
+
+    def __init__(self, axis):
+        '''Queue that runs beside the axis queues, e.g. to resolve a future.'''
+        self.axis = axis
+
+    def execute(self, task):
+        if isinstance(task, Poll):
+            return task()
+
+        task[0](*task[1:])
+        return True
+
+
+class MotionScheduler(Thread):
+
+    def __init__(self, controller):
+        '''Runs the task queues of every axis on a controller from one thread.'''
+        super(MotionScheduler, self).__init__()
+        self.daemon = True
+
+        self.controller = controller
+
+        self._cond = Condition()
+        self._queues = {}               # pending tasks by axis
+        self._ready = deque()           # axes with a task ready to run
+        self._timers = []               # heap of (due, seq, axis) for polled tasks
+        self._parked = set()            # axes whose polled task waits for wake()
+        self._seq = itertools.count()
+        self._busy = None               # axis whose task is executing
+        self._stopping = False
+
+    ##
+    # Queue
+    ##
+
+    def schedule(self, axis, tasks):
+        '''Appends tasks to the queue of axis.'''
+        with self._cond:
+            queue = self._queues.setdefault(axis, deque())
+            idle = not queue
+            queue.extend(tasks)
+
+            if idle and queue and axis is not self._busy:
+                self._ready.append(axis)
+                self._cond.notify_all()
+
+    def clear(self, axis):
+        '''Drops all pending tasks of axis.'''
+        with self._cond:
+            queue = self._queues.get(axis, deque())
+            dropped = list(queue)
+            queue.clear()
+            self._cond.notify_all()
+
+        # tell whoever waits on a dropped task that it will not run
+        for task in dropped:
+            cancel = getattr(task, 'cancel', None)
+            if cancel is not None:
+                cancel()
+
+    def tasks(self, axis):
+        '''Returns a copy of the pending tasks of axis.'''
+        with self._cond:
+            return list(self._queues.get(axis, ()))
+
+    def pending(self, axis):
+        '''Returns True while axis has queued or executing tasks.'''
+        with self._cond:
+            return bool(self._queues.get(axis)) or self._busy is axis
+
+    def wake(self):
+        '''Re-checks every polled task now, e.g. after an interrupt.'''
+        with self._cond:
+            for axis in [timer[2] for timer in self._timers] + list(self._parked):
+                if axis not in self._ready:
+                    self._ready.append(axis)
+
+            self._timers = []
+            self._parked.clear()
+            self._cond.notify_all()
+
+    def stop(self):
+        '''Ends the worker after the task it is executing, pending tasks never run.'''
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def waitIdle(self, axis, timeout=None):
+        '''Blocks until axis has no pending tasks, returns False on timeout.'''
+        deadline = None if timeout is None else monotonic() + timeout
+        with self._cond:
+            while self._queues.get(axis) or self._busy is axis:
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            return True
+
+    ##
+    # Worker
+    ##
+
+    def _next(self):
+        '''Blocks until an axis is ready, sleeping without timeout when idle, None once stopped.'''
+        while not self._stopping:
+            now = monotonic()
+            while self._timers and self._timers[0][0] <= now:
+                axis = heapq.heappop(self._timers)[2]
+                if axis not in self._ready:
+                    self._ready.append(axis)
+
+            while self._ready:
+                axis = self._ready.popleft()
+                if self._queues.get(axis):
+                    return axis
+
+            if self._timers:
+                self._cond.wait(self._timers[0][0] - now)
+            else:
+                self._cond.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                axis = self._next()
+                if axis is None:
+                    return
+                task = self._queues[axis][0]
+                self._busy = axis
+
+            try:
+                done = axis.execute(task)
+            except Exception:
+                log.exception('Task {} failed on axis {}.'.format(task, axis.axis))
+                done = True
+
+            with self._cond:
+                self._busy = None
+                queue = self._queues[axis]
+
+                if queue and queue[0] is task:
+                    if done:
+                        queue.popleft()
+                        if not queue and isinstance(axis, Watch):
+                            del self._queues[axis]
+                    else:
+                        # poll again later, other axes run meanwhile
+                        if task.interval is None:
+                            self._parked.add(axis)
+                        else:
+                            heapq.heappush(self._timers, (monotonic() + task.interval, next(self._seq), axis))
+                        self._cond.notify_all()
+                        continue
+
+                # round robin between axes
+                if queue:
+                    self._ready.append(axis)
+
+                self._cond.notify_all()
@@ -0,0 +1,678 @@
+from threading import Thread, RLock, Event
+from collections import deque
+from .telemetry import DataRecord
+from .transport import GclibError
+from .clock import monotonic
+import logging as log
+import random
+import socket
+import time
+import re
+
+
+_register = re.compile(r'^([A-Z]{2})([A-H]?)=(\?|[-+]?\d*\.?\d+)$')
+_variable = re.compile(r'^([a-z][a-zA-Z0-9]{0,7})=([-+]?\d*\.?\d+)$')
+_command = re.compile(r'^([A-Z]{2})([A-H]*)$')
+_io = re.compile(r'^@(IN|OUT)\[(\d+)\]$')
+_array = re.compile(r'^([a-zA-Z][a-zA-Z0-9]{0,7})\[(\d*)\]$')
+
+
+class _Error(Exception):
+    '''Command rejected with a question mark, args are (code, message).'''
+
+
+class SimulatedAxis(object):
+
+    # register defaults, as after a reset
+    _defaults = {
+        'SP': 25000, 'AC': 256000, 'DC': 256000, 'JG': 25000, 'PR': 0, 'PA': 0,
+        'TL': 9.998, 'IL': 9.998, 'KP': 6, 'KI': 0, 'KD': 64, 'OF': 0, 'BR': 0,
+        'IT': 1, 'IP': 0, 'MC': 0, 'AM': 0
+    }
+
+    # torque model in volts: per count/s^2 of acceleration and friction
+    _inertia = 5e-6
+    _friction = 0.2
+
+    def __init__(self, limits=None):
+        '''Trapezoidal motion profile of one simulated servo axis.'''
+        self.registers = dict(self._defaults)
+        self.limits = limits            # (low, high) hard stops in counts
+
+        self.position = 0.0
+        self.velocity = 0.0
+        self.acceleration = 0.0
+        self.servo = False
+        self.moving = False
+        self.stalled = False
+        self.stop_code = 0
+
+        self._mode = 'PR'               # last of PR, PA or JG
+        self._target = 0.0
+        self._stopping = False
+        self._pushing = 1               # direction of the last commanded motion
+
+    def begin(self):
+        if not self.servo:
+            raise _Error(20, 'Begin not valid with motor off')
+        if self.moving:
+            raise _Error(7, 'Command not valid while running')
+
+        if self._mode == 'PR':
+            self._target = self.position + self.registers['PR']
+        elif self._mode == 'PA':
+            self._target = float(self.registers['PA'])
+
+        self.moving = True
+        self._stopping = False
+
+    def stop(self):
+        if self.moving:
+            self._stopping = True
+
+    def off(self):
+        self.servo = False
+        self.moving = False
+        self.velocity = 0.0
+        self.acceleration = 0.0
+
+    def define(self, position):
+        '''Redefines the current position, hard stops stay in place.'''
+        shift = position - self.position
+        self.position = position
+        if self.limits is not None:
+            self.limits = (self.limits[0] + shift, self.limits[1] + shift)
+
+    def set(self, register, value):
+        if register in ('PR', 'PA', 'JG'):
+            if self.moving and register != 'JG':
+                raise _Error(7, 'Command not valid while running')
+            self._mode = register
+        self.registers[register] = value
+
+    @property
+    def torque(self):
+        if not self.servo:
+            return 0.0
+
+        limit = abs(self.registers['TL'])
+        if self.stalled:
+            return limit * self._pushing
+
+        torque = self._inertia * self.acceleration
+        if self.velocity:
+            torque += self._friction if self.velocity > 0 else -self._friction
+        return max(-limit, min(limit, torque))
+
+    @property
+    def error(self):
+        return self.acceleration * 1e-4
+
+    def _approach(self, desired, dt):
+        '''Changes velocity towards desired at the profile rates.'''
+        speeding_up = abs(desired) > abs(self.velocity) and desired * self.velocity >= 0
+        rate = self.registers['AC'] if speeding_up else self.registers['DC']
+        change = max(-rate * dt, min(rate * dt, desired - self.velocity))
+        self.velocity += change
+        self.acceleration = change / dt
+
+    def step(self, dt):
+        '''Advances dt seconds, returns True when a move completed.'''
+        if not self.moving:
+            self.velocity = 0.0
+            self.acceleration = 0.0
+            return False
+
+        if self._stopping or self._mode == 'JG':
+            self._approach(0.0 if self._stopping else self.registers['JG'], dt)
+            self.position += self.velocity * dt
+
+        else:
+            distance = self._target - self.position
+            braking = self.velocity ** 2 / (2.0 * self.registers['DC'])
+
+            if abs(distance) <= abs(self.velocity) * dt and abs(self.velocity) <= self.registers['DC'] * dt * 2:
+                # close enough to land on target
+                self.position = self._target
+                self.velocity = 0.0
+                self.acceleration = 0.0
+                self._stopping = True
+
+            elif distance * self.velocity > 0 and abs(distance) <= braking:
+                self._approach(0.0, dt)
+                self.position += self.velocity * dt
+
+            else:
+                speed = abs(self.registers['SP'])
+                self._approach(speed if distance > 0 else -speed, dt)
+                self.position += self.velocity * dt
+
+        if self.velocity:
+            self._pushing = 1 if self.velocity > 0 else -1
+
+        # hard stops
+        self.stalled = False
+        if self.limits is not None:
+            low, high = self.limits
+            if self.position <= low or self.position >= high:
+                self.position = max(low, min(high, self.position))
+                self.velocity = 0.0
+                self.stalled = True
+
+        if self._stopping and self.velocity == 0.0:
+            self.moving = False
+            self.stalled = False
+            self._stopping = False
+            self.acceleration = 0.0
+            self.stop_code = 1
+            return True
+
+        return False
+
+
+class SimulatedController(object):
+
+    # longest integration step of the motion model (seconds)
+    _step = 0.001
+
+    _revision = 'DMC4080 Rev 1.2c (simulated)'
+
+    def __init__(self, axes='ABCDEFGH', latency=0.0, jitter=0.0, time_scale=1.0, limits=None):
+        '''Galil controller model answering the command subset used by this project.'''
+        # drop-in for gclib: GalilController(transport=SimulatedController().handle),
+        # motion runs time_scale times faster than the host clock and every
+        # command waits latency seconds plus gaussian jitter
+        self.axes = dict((axis, SimulatedAxis(limits)) for axis in axes)
+        self.latency = latency
+        self.jitter = jitter
+        self.time_scale = time_scale
+
+        self.inputs = [1] * 16
+        self.outputs = [0] * 16
+        self.variables = {}
+        self.arrays = {}
+        self.commands = 0               # commands executed
+
+        self._lock = RLock()
+        self._last = monotonic()
+        self._time = 0.0                # simulated seconds
+        self._error = (0, '')
+        self._interrupts = []           # queues of subscribed handles
+        self._interrupt_mask = 0
+
+        # RA/RD/RC recording: arrays, sources, 2^n sample interval, records left
+        self._record_arrays = []
+        self._record_sources = []
+        self._record_interval = 0
+        self._record_left = 0
+        self._record_next = 0           # next array element, _RD
+        self._record_size = 0           # elements a circular recording wraps at, 0 if not circular
+        self._samples = 0               # servo samples since start
+
+    ##
+    # Handles
+    ##
+
+    def handle(self):
+        '''Returns a new gclib-like handle to this controller.'''
+        return SimulatedHandle(self)
+
+    def serve(self, port=23, host='127.0.0.1'):
+        '''Answers Galil ASCII commands on a TCP port, e.g. for gclib --direct.'''
+        server = SimulatedServer(self, host, port)
+        server.start()
+        return server
+
+    ##
+    # Model
+    ##
+
+    def advance(self):
+        '''Integrates motion up to the current simulated time.'''
+        with self._lock:
+            now = monotonic()
+            dt = (now - self._last) * self.time_scale
+            self._last = now
+
+            while dt > 0:
+                step = min(dt, self._step)
+                dt -= step
+                self._time += step
+
+                for name, axis in self.axes.items():
+                    if axis.step(step):
+                        self._interrupt(0xD0 + ord(name) - ord('A'))
+
+                self._samples += 1
+                if self._record_left and self._samples % self._record_interval == 0:
+                    self._sample()
+
+    def _interrupt(self, status):
+        if self._interrupt_mask & (1 << (status - 0xD0)):
+            for queue in self._interrupts:
+                queue.append(status)
+
+    def _axes(self, letters):
+        letters = letters or ''.join(sorted(self.axes.keys()))
+        try:
+            return [(letter, self.axes[letter]) for letter in letters]
+        except KeyError:
+            raise _Error(1, 'Unrecognized command')
+
+    @staticmethod
+    def _format(value):
+        '''Formats a register value like the controller, integers without decimals.'''
+        if float(value) == int(value):
+            return ' {}'.format(int(value))
+        return ' {:.4f}'.format(value)
+
+    @staticmethod
+    def _message(value):
+        '''Formats an MG value, always with four decimals.'''
+        return ' {:.4f}'.format(value)
+
+    ##
+    # Commands
+    ##
+
+    def execute(self, line):
+        '''Runs a command line, returns replies or raises GclibError on the first bad command.'''
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+        replies = []
+        with self._lock:
+            self.advance()
+
+            for command in line.strip().split(';'):
+                command = command.strip()
+                if not command:
+                    continue
+
+                try:
+                    reply = self._execute(command)
+                except _Error as e:
+                    self._error = e.args
+                    raise GclibError('question mark returned by controller')
+
+                self.commands += 1
+                if reply is not None:
+                    replies.append(reply)
+
+        return '\r\n'.join(replies)
+
+    def _execute(self, command):
+        match = _variable.match(command)
+        if match:
+            self.variables[match.group(1)] = float(match.group(2))
+            return None
+
+        if command.startswith('MG'):
+            return ' '.join(self._operand(operand.strip()) for operand in command[2:].split(','))
+
+        if command == 'TC1':
+            return '{} {}'.format(*self._error)
+
+        match = _register.match(command)
+        if match:
+            register, letter, value = match.groups()
+            axis = self._axes(letter or 'A')[0][1]
+
+            if register == 'DP':
+                axis.define(float(value))
+                return None
+
+            if value == '?':
+                return self._format(axis.registers.get(register, 0))
+
+            if register not in axis.registers:
+                raise _Error(1, 'Unrecognized command')
+
+            axis.set(register, float(value))
+            return None
+
+        if command[:2] in ('SB', 'CB'):
+            try:
+                self.outputs[int(command[2:])] = 1 if command[:2] == 'SB' else 0
+            except (ValueError, IndexError):
+                raise _Error(1, 'Unrecognized command')
+            return None
+
+        if command[:2] == 'EI':
+            self._interrupt_mask = int(command[2:].split(',')[0] or 0)
+            return None
+
+        if command[:2] in ('BN', 'BP', 'HX'):
+            return None
+
+        if command[:2] in ('DM', 'DA', 'RA', 'RD', 'RC'):
+            self._recording(command[:2], [operand.strip() for operand in command[2:].split(',')])
+            return None
+
+        match = _command.match(command)
+        if not match:
+            raise _Error(1, 'Unrecognized command')
+
+        mnemonic, letters = match.groups()
+        axes = self._axes(letters)
+
+        if mnemonic == 'SH':
+            for letter, axis in axes:
+                axis.servo = True
+        elif mnemonic == 'MO':
+            for letter, axis in axes:
+                axis.off()
+        elif mnemonic == 'BG':
+            for letter, axis in axes:
+                axis.begin()
+        elif mnemonic == 'ST':
+            for letter, axis in axes:
+                axis.stop()
+        elif mnemonic == 'AM':
+            self._lock.release()
+            try:
+                while any(axis.moving for letter, axis in axes):
+                    time.sleep(self._step)
+                    self.advance()
+            finally:
+                self._lock.acquire()
+        elif mnemonic == 'TP':
+            return ', '.join(str(int(round(axis.position))) for letter, axis in axes)
+        elif mnemonic == 'TV':
+            return ', '.join(str(int(round(axis.velocity))) for letter, axis in axes)
+        elif mnemonic == 'TE':
+            return ', '.join(str(int(round(axis.error))) for letter, axis in axes)
+        elif mnemonic == 'TT':
+            return ', '.join('{:.4f}'.format(axis.torque) for letter, axis in axes)
+        else:
+            raise _Error(1, 'Unrecognized command')
+
+        return None
+
+    def _operand(self, operand):
+        '''Evaluates one MG operand: _BGA, _XQn, @IN[n], @OUT[n] or a variable.'''
+        if operand.startswith('_BG'):
+            return self._message(int(self._axes(operand[3:])[0][1].moving))
+
+        if operand in ('_RC', '_RD', '_TM'):
+            return self._message({'_RC': int(self._record_left > 0), '_RD': self._record_next,
+                                  '_TM': self._step * 1e6}[operand])
+
+        if operand.startswith('_XQ'):
+            # programs are not simulated, threads never run
+            return self._message(-1)
+
+        match = _io.match(operand)
+        if match:
+            bits = self.inputs if match.group(1) == 'IN' else self.outputs
+            try:
+                return self._message(bits[int(match.group(2))])
+            except IndexError:
+                raise _Error(1, 'Unrecognized command')
+
+        if operand in self.variables:
+            return self._message(self.variables[operand])
+
+        raise _Error(1, 'Unrecognized command')
+
+    ##
+    # Record arrays
+    ##
+
+    def _recording(self, mnemonic, operands):
+        '''Runs DM, DA, RA, RD or RC.'''
+        if mnemonic in ('DM', 'DA', 'RA'):
+            arrays = [_array.match(operand) for operand in operands]
+            if not all(arrays):
+                raise _Error(1, 'Unrecognized command')
+
+            for match in arrays:
+                name, size = match.groups()
+                if mnemonic == 'DM':
+                    if name in self.arrays or not size:
+                        raise _Error(1, 'Unrecognized command')
+                    self.arrays[name] = [0.0] * int(size)
+                elif name not in self.arrays:
+                    raise _Error(1, 'Unrecognized command')
+                elif mnemonic == 'DA':
+                    del self.arrays[name]
+
+            if mnemonic == 'RA':
+                self._record_arrays = [match.group(1) for match in arrays]
+
+        elif mnemonic == 'RD':
+            sources = []
+            for operand in operands:
+                if operand[:3] not in ('_TP', '_TV', '_TT', '_TE') or len(operand) != 4:
+                    raise _Error(1, 'Unrecognized command')
+                sources.append((operand[1:3], self._axes(operand[3])[0][1]))
+            self._record_sources = sources
+
+        else:
+            try:
+                values = [int(operand) for operand in operands]
+            except ValueError:
+                raise _Error(1, 'Unrecognized command')
+
+            self._record_left = 0
+            self._record_size = 0
+            if values[0] > 0:
+                if len(self._record_arrays) != len(self._record_sources):
+                    raise _Error(1, 'Unrecognized command')
+                size = min(len(self.arrays[name]) for name in self._record_arrays)
+                count = values[1] if len(values) > 1 and values[1] else size
+                self._record_interval = 2 ** values[0]
+                self._record_next = 0
+
+                # a negative count records into the first -count elements until RC0
+                if count < 0:
+                    self._record_size = min(-count, size)
+                    self._record_left = 1
+                else:
+                    self._record_left = min(count, size)
+                self._sample()
+
+    def _sample(self):
+        '''Stores one record of every source.'''
+        for name, (source, axis) in zip(self._record_arrays, self._record_sources):
+            value = {'TP': axis.position, 'TV': axis.velocity, 'TT': axis.torque, 'TE': axis.error}[source]
+            self.arrays[name][self._record_next] = round(value, 4) if source == 'TT' else int(round(value))
+
+        self._record_next += 1
+        if self._record_size:
+            self._record_next %= self._record_size
+        else:
+            self._record_left -= 1
+
+    ##
+    # Data records
+    ##
+
+    def record(self):
+        '''Returns a DMC-40x0 data record of the current state.'''
+        with self._lock:
+            self.advance()
+
+            letters = ''.join(sorted(self.axes.keys()))
+            mask = sum(1 << (ord(letter) - ord('A')) for letter in letters)
+            size = DataRecord._general.size + len(letters) * DataRecord._axis.size
+
+            inputs = [sum(self.inputs[8 * i + b] << b for b in range(8)) for i in range(2)] + [0] * 8
+            outputs = [sum(self.outputs[8 * i + b] << b for b in range(8)) for i in range(2)] + [0] * 8
+
+            record = DataRecord._general.pack(
+                0x80, mask, size, int(self._time * 1024) & 0xFFFF,
+                *(inputs + outputs + [self._error[0], 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]))
+
+            for letter in letters:
+                axis = self.axes[letter]
+                status = DataRecord._moving_bit if axis.moving else 0
+                record += DataRecord._axis.pack(
+                    status, 0, axis.stop_code, int(round(axis.position)), int(round(axis.position)),
+                    int(round(axis.error)), 0, int(round(axis.velocity)),
+                    int(round(axis.torque / DataRecord._torque_scale)), 0, 0, 0, 0)
+
+            return record
+
+
+class SimulatedHandle(object):
+
+    def __init__(self, controller):
+        '''gclib.py look-alike connected to a SimulatedController.'''
+        self.controller = controller
+        self.timeout = 5.0
+
+        self._open = False
+        self._record_period = None
+        self._next_record = None
+        self._interrupts = None
+
+    def GOpen(self, address):
+        self._open = True
+
+        # subscriptions, e.g. '-a 10.0.0.2 --direct -s DR'
+        words = address.split()
+        for flag in ('-s', '--subscribe'):
+            if flag in words and words.index(flag) + 1 < len(words):
+                kind = words[words.index(flag) + 1].upper()
+                if kind in ('EI', 'ALL') and self._interrupts is None:
+                    self._interrupts = deque()
+                    self.controller._interrupts.append(self._interrupts)
+
+    def GClose(self):
+        if self._interrupts is not None:
+            self.controller._interrupts.remove(self._interrupts)
+            self._interrupts = None
+        self._open = False
+
+    def _check(self):
+        if not self._open:
+            raise GclibError('no connection')
+
+    def GInfo(self):
+        self._check()
+        return 'simulated, {}, 0'.format(self.controller._revision)
+
+    def GTimeout(self, timeout):
+        self.timeout = timeout / 1000.0
+
+    def GCommand(self, command):
+        self._check()
+        return self.controller.execute(command)
+
+    def GProgramDownload(self, program, preprocessor=''):
+        raise GclibError('programs are not simulated')
+
+    def GArrayUpload(self, array_name, first=-1, last=-1):
+        '''Returns elements first to last of an array, all by default.'''
+        self._check()
+        with self.controller._lock:
+            try:
+                values = self.controller.arrays[array_name]
+            except KeyError:
+                raise GclibError('question mark returned by controller')
+
+            first = 0 if first < 0 else first
+            last = len(values) - 1 if last < 0 else last
+            return list(values[first:last + 1])
+
+    def GRecordRate(self, period):
+        self._record_period = period / 1000.0 if period else None
+        self._next_record = monotonic()
+
+    def GRecord(self, method):
+        '''Returns the next data record, paced by GRecordRate for DR (method 0).'''
+        self._check()
+        if method == 0:
+            if self._record_period is None:
+                raise GclibError('timeout')
+            delay = self._next_record - monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_record = max(self._next_record + self._record_period, monotonic())
+
+        return bytearray(self.controller.record())
+
+    def GInterrupt(self):
+        '''Returns the next interrupt status byte, raises GclibError on timeout.'''
+        self._check()
+        if self._interrupts is None:
+            raise GclibError('not subscribed to interrupts')
+
+        deadline = monotonic() + self.timeout
+        while monotonic() < deadline:
+            self.controller.advance()
+            try:
+                return self._interrupts.popleft()
+            except IndexError:
+                time.sleep(self.controller._step)
+
+        raise GclibError('timeout')
+
+
+class SimulatedServer(Thread):
+
+    # ^R^V asks for the firmware revision
+    _revision_request = '\x12\x16'
+
+    def __init__(self, controller, host='127.0.0.1', port=23):
+        '''Serves the Galil ASCII protocol of a SimulatedController over TCP.'''
+        super(SimulatedServer, self).__init__()
+        self.daemon = True
+
+        self.controller = controller
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self._socket.listen(5)
+        self.address = self._socket.getsockname()
+
+        self._stopping = Event()
+
+    def stop(self):
+        self._stopping.set()
+        self._socket.close()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                client, address = self._socket.accept()
+            except socket.error:
+                break
+
+            session = Thread(target=self.session, args=(client,))
+            session.daemon = True
+            session.start()
+
+    def session(self, client):
+        '''Answers each CR terminated line with replies and a colon, or a question mark.'''
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        buffered = ''
+        while not self._stopping.is_set():
+            try:
+                data = client.recv(4096)
+            except socket.error:
+                break
+            if not data:
+                break
+
+            buffered += data.decode('latin-1')
+            while '\r' in buffered:
+                line, buffered = buffered.split('\r', 1)
+                line = line.strip('\n')
+
+                if self._revision_request in line:
+                    reply = self.controller._revision + '\r\n:'
+                else:
+                    try:
+                        reply = self.controller.execute(line)
+                        reply = (reply + '\r\n:') if reply else ':'
+                    except GclibError:
+                        reply = '?'
+                    except Exception:
+                        log.exception('Simulator failed on {}.'.format(line))
+                        reply = '?'
+
+                client.sendall(reply.encode('latin-1'))
+
+        client.close()
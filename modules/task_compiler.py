@@ -0,0 +1,44 @@
+class Batch(object):
+
+    def __init__(self, tasks):
+        '''Consecutive tasks that are sent to the controller as one command line.'''
+        self.tasks = tasks
+
+    def __repr__(self):
+        return 'Batch({})'.format(self.tasks)
+
+
+def batchable(axis, task):
+    '''Returns True if task only sends commands and needs no reply.'''
+    if not isinstance(task, tuple) or len(task) == 0:
+        return False
+
+    if isinstance(task[0], str):
+        # register set from an immediate value
+        return task[0] in axis._batchable_properties and len(task) == 2 and not isinstance(task[1], str)
+
+    # method of the axis without arguments
+    return len(task) == 1 and getattr(task[0], '__self__', None) is axis and \
+        task[0].__name__ in axis._batchable_methods
+
+
+def compileTasks(axis, tasks):
+    '''Merges runs of batchable tasks into Batch tasks.'''
+    compiled = []
+    run = []
+
+    for task in list(tasks) + [None]:
+        if task is not None and batchable(axis, task):
+            run.append(task)
+            continue
+
+        if len(run) > 1:
+            compiled.append(Batch(run))
+        else:
+            compiled.extend(run)
+        run = []
+
+        if task is not None:
+            compiled.append(task)
+
+    return compiled
@@ -0,0 +1,148 @@
+from threading import Thread, Event
+from .transport import GclibError
+import logging as log
+import struct
+import time
+
+
+class Snapshot(object):
+
+    def __init__(self, axes, fields, timestamp):
+        '''Holds raw telemetry fields sampled from several axes at once.'''
+        self.axes = axes                # axis letters, e.g. 'ABCEFG'
+        self.fields = tuple(fields)     # field names, e.g. ('position', 'torque')
+        self.time = timestamp           # time of sampling
+
+        # values by axis, then by field
+        self.data = dict((axis, {}) for axis in axes)
+
+    def __getitem__(self, axis):
+        return self.data[axis.upper()]
+
+    def covers(self, axes, fields):
+        '''Returns True if snapshot contains every axis and field.'''
+        return set(axes) <= set(self.axes) and set(fields) <= set(self.fields)
+
+
+class DataRecord(object):
+    '''Decodes DMC-40x0 data records (DR/QR) into snapshots.'''
+
+    # general block: header, sample number, inputs, outputs, error code,
+    # thread status, amplifier status, contour and S/T plane status
+    _general = struct.Struct('<BBHH10B10BBBLLHHHlHHHlH')
+
+    # axis block: status, switches, stop code, reference position, motor
+    # position, position error, aux position, velocity, torque, analog in,
+    # hall input, reserved, user variable
+    _axis = struct.Struct('<HBBllllllHBBl')
+
+    # torque counts to volts (+/-32767 is +/-9.998V)
+    _torque_scale = 9.9982 / 32767
+
+    # axis status bit set while a move is in progress
+    _moving_bit = 0x8000
+
+    fields = ('position', 'velocity', 'torque', 'error', 'status', 'moving', 'switches', 'stop_code')
+
+    @classmethod
+    def decode(cls, record, timestamp=None):
+        '''Returns a Snapshot of every axis present in record.'''
+        record = bytes(bytearray(record))
+        general = cls._general.unpack_from(record, 0)
+
+        # second header byte flags which of axes A-H are present
+        mask = general[1]
+        axes = ''.join(chr(ord('A') + i) for i in range(8) if mask & (1 << i))
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        snapshot = Snapshot(axes, cls.fields, timestamp)
+        snapshot.sample = general[3]
+        snapshot.inputs = general[4:14]
+        snapshot.outputs = general[14:24]
+        snapshot.error_code = general[24]
+
+        offset = cls._general.size
+        for axis in axes:
+            block = cls._axis.unpack_from(record, offset)
+            offset += cls._axis.size
+
+            snapshot.data[axis] = {
+                'position': float(block[4]),
+                'velocity': float(block[7]),
+                'torque': block[8] * cls._torque_scale,
+                'error': float(block[5]),
+                'status': block[0],
+                'moving': bool(block[0] & cls._moving_bit),
+                'switches': block[1],
+                'stop_code': block[2]
+            }
+
+        return snapshot
+
+
+class TelemetryStream(Thread):
+
+    # pause after a failed record, doubled while failures repeat (seconds)
+    _retry_min = 0.01
+    _retry_max = 1.0
+
+    def __init__(self, controller, rate=100):
+        '''Streams data records from a controller on a dedicated connection.'''
+        super(TelemetryStream, self).__init__()
+        self.daemon = True
+
+        self.controller = controller
+        self.rate = float(rate)         # records per second
+        self.latest = None              # last decoded snapshot
+
+        self._subscribers = []
+        self._stopping = Event()
+
+    @property
+    def period(self):
+        return 1.0 / self.rate
+
+    def subscribe(self, callback):
+        '''Calls callback with every new snapshot from the stream thread.'''
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        # separate handle subscribed to data records, the command lock is never taken
+        g = self.controller._transport()
+        try:
+            g.GOpen('-a {} --direct -s DR'.format(self.controller.address))
+            g.GRecordRate(1000.0 / self.rate)
+        except GclibError:
+            log.warning('Data record stream unavailable at ({}).'.format(self.controller.address))
+            return
+
+        retry = 0
+        while not self._stopping.is_set():
+            try:
+                sample = DataRecord.decode(g.GRecord(0))
+            except (GclibError, struct.error):
+                # a dropped link fails at once, do not spin on it
+                retry = min(self._retry_max, max(self._retry_min, retry * 2))
+                self._stopping.wait(retry)
+                continue
+
+            retry = 0
+
+            # publish by replacing the reference, readers never lock
+            self.latest = sample
+            for callback in list(self._subscribers):
+                callback(sample)
+
+        try:
+            g.GRecordRate(0)
+            g.GClose()
+        except GclibError:
+            pass
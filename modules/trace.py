@@ -0,0 +1,224 @@
+from collections import namedtuple
+from threading import Lock
+import itertools
+import argparse
+import struct
+import mmap
+import json
+import math
+import time
+import sys
+import os
+import re
+
+
+Record = namedtuple('Record', 'seq time controller axes command arg reply latency lock_wait error')
+
+# command mnemonic followed by the axes it addresses, e.g. TPABC, PRA=10, MG_BGA
+_axes = re.compile(r'^(?:MG_)?[A-Z]{2}([A-H]*)(?:=|$)')
+_number = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+class TraceChannel(object):
+
+    def __init__(self, recorder, controller):
+        '''Records commands of one controller, see TraceRecorder.'''
+        self.recorder = recorder
+        self.controller = controller
+
+    def record(self, command, reply, latency, lock_wait):
+        self.recorder.record(self.controller, command, reply, latency, lock_wait)
+
+
+class TraceRecorder(object):
+
+    # header: magic, version, record size, capacity, records written
+    _header = struct.Struct('<8sHHQQ')
+    _header_size = 64
+    _magic = b'TTTRACE1'
+    _version = 1
+
+    # record: sequence, wall time, controller, axes mask, command id, first
+    # argument, first reply value, latency, lock wait, error flag
+    _record = struct.Struct('<QdBBHddffB3x')
+
+    # parsed commands kept for reuse
+    _cache_size = 4096
+
+    def __init__(self, path, capacity=1000000):
+        '''Ring of fixed size binary command records in a memory mapped file.'''
+        self.path = path
+        self.capacity = capacity
+
+        size = self._header_size + capacity * self._record.size
+        resume = os.path.exists(path) and os.path.getsize(path) == size
+
+        self._file = open(path, 'r+b' if resume else 'w+b')
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), size)
+
+        written = 0
+        if resume:
+            magic, version, record, capacity, written = self._header.unpack_from(self._mm, 0)
+            if magic != self._magic or record != self._record.size:
+                written = 0
+
+        # next() on a count is atomic, so slots are reserved without a lock
+        self._seq = itertools.count(written)
+
+        # command shapes and controller names, stored next to the ring
+        self._lock = Lock()
+        self._tables = {'commands': [], 'controllers': []}
+        if resume and os.path.exists(self._tables_path(path)):
+            with open(self._tables_path(path)) as f:
+                self._tables = json.load(f)
+        self._ids = dict((shape, i) for i, shape in enumerate(self._tables['commands']))
+        self._parsed = {}
+
+        self._writeHeader(written)
+
+    @staticmethod
+    def _tables_path(path):
+        return path + '.json'
+
+    def _writeHeader(self, written):
+        self._header.pack_into(self._mm, 0, self._magic, self._version, self._record.size, self.capacity, written)
+
+    def _intern(self, table, name):
+        with self._lock:
+            names = self._tables[table]
+            if name not in names:
+                names.append(name)
+                with open(self._tables_path(self.path), 'w') as f:
+                    json.dump(self._tables, f)
+            return names.index(name)
+
+    def channel(self, controller):
+        '''Returns a TraceChannel recording commands of the named controller.'''
+        return TraceChannel(self, self._intern('controllers', str(controller)))
+
+    def _parse(self, command):
+        '''Returns (command id, axes mask, first argument) of command.'''
+        parsed = self._parsed.get(command)
+        if parsed is not None:
+            return parsed
+
+        # shape is the command with numbers removed, so moves to different
+        # positions share an id
+        shape = _number.sub('#', command)
+        if shape not in self._ids:
+            self._ids[shape] = self._intern('commands', shape)
+
+        mask = 0
+        for segment in command.split(';'):
+            match = _axes.match(segment)
+            if match:
+                for axis in match.group(1):
+                    mask |= 1 << (ord(axis) - ord('A'))
+
+        number = _number.search(command)
+        parsed = (self._ids[shape], mask, float(number.group()) if number else float('nan'))
+
+        if len(self._parsed) >= self._cache_size:
+            self._parsed.clear()
+        self._parsed[command] = parsed
+        return parsed
+
+    def record(self, controller, command, reply, latency, lock_wait, timestamp=None):
+        command_id, mask, arg = self._parse(command)
+
+        error = reply == '-1'
+        number = _number.search(reply)
+        value = float(number.group()) if number and not error else float('nan')
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        seq = next(self._seq)
+        offset = self._header_size + (seq % self.capacity) * self._record.size
+        self._record.pack_into(self._mm, offset, seq, timestamp, controller, mask,
+                               command_id, arg, value, latency, lock_wait, error)
+        self._writeHeader(seq + 1)
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+
+def read(path):
+    '''Returns trace records of path, oldest first.'''
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, version, size, capacity, written = TraceRecorder._header.unpack_from(data, 0)
+    if magic != TraceRecorder._magic or size != TraceRecorder._record.size:
+        raise ValueError('{} is not a trace file'.format(path))
+
+    with open(TraceRecorder._tables_path(path)) as f:
+        tables = json.load(f)
+
+    slots = [TraceRecorder._record.unpack_from(data, TraceRecorder._header_size + slot * size)
+             for slot in range(min(written + 1, capacity))]
+
+    # writers update the header in any order, trust the newest slot
+    if slots:
+        written = max(written, max(fields[0] for fields in slots) + 1)
+
+    records = []
+    for fields in slots:
+        seq, timestamp, controller, mask, command_id, arg, reply, latency, lock_wait, error = fields
+
+        # a slot overwritten during the dump is out of range
+        if seq >= written or seq < written - capacity:
+            continue
+
+        axes = ''.join(chr(ord('A') + i) for i in range(8) if mask & (1 << i))
+        records.append(Record(seq, timestamp, tables['controllers'][controller], axes,
+                              tables['commands'][command_id], arg, reply, latency, lock_wait, bool(error)))
+
+    records.sort(key=lambda r: r.seq)
+    return records
+
+
+def _percentile(values, p):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(math.ceil(len(values) * p / 100.0)) - 1)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Decodes command trace files.')
+    parser.add_argument('action', choices=['dump', 'stats'])
+    parser.add_argument('path')
+    parser.add_argument('--last', type=int, default=0, help='only the last N records')
+    args = parser.parse_args(argv)
+
+    records = read(args.path)
+    if args.last:
+        records = records[-args.last:]
+
+    if args.action == 'dump':
+        for r in records:
+            print('{:>10} {:.6f} {:<16} {:<8} {:<24} {:>12g} {:>12g} {:8.3f}ms {:8.3f}ms{}'.format(
+                r.seq, r.time, r.controller, r.axes, r.command, r.arg, r.reply,
+                r.latency * 1000.0, r.lock_wait * 1000.0, ' ERROR' if r.error else ''))
+
+    else:
+        by_command = {}
+        for r in records:
+            by_command.setdefault((r.controller, r.command), []).append(r)
+
+        print('{:<16} {:<24} {:>8} {:>7} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+            'controller', 'command', 'count', 'errors', 'p50 ms', 'p99 ms', 'max ms', 'wait p99', 'wait max'))
+        for (controller, command), rs in sorted(by_command.items()):
+            latency = [r.latency * 1000.0 for r in rs]
+            wait = [r.lock_wait * 1000.0 for r in rs]
+            print('{:<16} {:<24} {:>8} {:>7} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+                controller, command, len(rs), sum(r.error for r in rs), _percentile(latency, 50),
+                _percentile(latency, 99), max(latency), _percentile(wait, 99), max(wait)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
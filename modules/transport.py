@@ -0,0 +1,18 @@
+# gclib is only needed to talk to real controllers, simulated handles work without it
+try:
+    import gclib
+    GclibError = gclib.GclibError
+
+except ImportError:
+    gclib = None
+
+    class GclibError(Exception):
+        pass
+
+
+def gclibHandle():
+    '''Returns a new gclib handle, the default transport of GalilController.'''
+    if gclib is None:
+        raise GclibError('gclib is not installed')
+
+    return gclib.py()
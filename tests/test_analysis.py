@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+import time
+import unittest
+
+from modules.galil_wrapper import GalilController, GalilAxis
+from modules.simulator import SimulatedController
+
+try:
+    import numpy as np
+    from modules.analysis import analyze, moves, split
+    from modules.recorder import RunRecorder, Run
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class SplitTest(unittest.TestCase):
+
+    def test_cuts_inside_runs(self):
+        starts, stops = split([2, 10], [8, 20], [0, 5, 9, 10, 15, 25])
+
+        self.assertEqual(list(starts), [2, 5, 10, 15])
+        self.assertEqual(list(stops), [5, 8, 15, 20])
+
+    def test_margin(self):
+        starts, stops = split([2], [20], [3, 10, 19], margin=2)
+
+        self.assertEqual(list(starts), [2, 10])
+        self.assertEqual(list(stops), [10, 20])
+
+    def test_no_runs(self):
+        starts, stops = split([], [], [3])
+        self.assertEqual((len(starts), len(stops)), (0, 0))
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class PingPongCyclesTest(unittest.TestCase):
+
+    repeats = 5
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.sim = SimulatedController(axes='A')
+        self.galil = GalilController(transport=self.sim.handle)
+        self.galil.open('sim')
+
+        self.axis = GalilAxis('A', self.galil)
+        self.axis.is_homed = True
+        self.axis.home_limit = 10000.0
+
+    def tearDown(self):
+        self.galil.shutdown()
+        shutil.rmtree(self.path)
+
+    def test_back_to_back_strokes(self):
+        # interrupts start each stroke right after the last, the moving flag of
+        # the 100 Hz records rarely clears in between
+        self.galil.startMonitor()
+        self.galil.startTelemetry(100)
+        self.galil.command('DPA=10000')
+        self.axis.acceleration = self.axis.deceleration = 2000000
+
+        recorder = RunRecorder(self.path)
+        recorder.attach({'A': self.axis})
+        recorder.start()
+
+        self.axis.pingPong(50000, self.repeats, 0.25, 0.75)
+        self.assertTrue(self.galil.scheduler.waitIdle(self.axis, 10.0))
+
+        # records of the axis at rest end the last move
+        time.sleep(0.1)
+        recorder.close()
+
+        # records jitter by tens of counts around each turn
+        run = Run(self.path)
+        metrics = analyze(run, 'A', deadband=50)
+        moving = moves(run.column('telemetry/A', 'moving'))[0]
+
+        # the first stroke comes from the start position, then 5000 counts each way
+        self.assertEqual(len(metrics['stroke']), 2 * self.repeats)
+        self.assertLessEqual(len(moving), 2 * self.repeats)
+        np.testing.assert_allclose(np.abs(metrics['stroke'][1:]), 5000, rtol=0.1)
+        self.assertTrue((np.sign(metrics['stroke'][1:]) != np.sign(metrics['stroke'][:-1])).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
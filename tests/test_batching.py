@@ -0,0 +1,61 @@
+import unittest
+
+from modules.galil_wrapper import GalilController
+from modules.simulator import SimulatedController
+
+
+class _StaleMarker(SimulatedController):
+
+    def _execute(self, command):
+        '''Simulator whose batch marker keeps a value from long ago.'''
+        if command.startswith('tq='):
+            return None
+        return super(_StaleMarker, self)._execute(command)
+
+
+class CommandBatchTest(unittest.TestCase):
+
+    def connect(self, sim):
+        self.sim = sim
+        self.galil = GalilController(transport=sim.handle)
+        self.galil.open('sim')
+
+    def setUp(self):
+        self.connect(SimulatedController(axes='AB'))
+
+    def tearDown(self):
+        self.galil.shutdown()
+
+    def test_sends_all(self):
+        self.assertEqual(self.galil.commandBatch(['SPA=100', 'ACA=2000', 'SPB=300']), [])
+        self.assertEqual(self.sim.axes['A'].registers['SP'], 100)
+        self.assertEqual(self.sim.axes['B'].registers['SP'], 300)
+
+    def test_failure_resends_the_rest(self):
+        errors = self.galil.commandBatch(['SPA=100', 'XXA', 'SPB=300'])
+
+        self.assertEqual([command for command, error in errors], ['XXA'])
+        self.assertEqual(self.sim.axes['A'].registers['SP'], 100)
+        self.assertEqual(self.sim.axes['B'].registers['SP'], 300)
+
+    def test_lost_connection_ends(self):
+        self.galil._g.GClose()
+        errors = self.galil.commandBatch(['SPA=100', 'SPB=300', 'ACA=2000'])
+
+        self.assertEqual(errors, [('SPA=100', 'no reply'), ('SPB=300', 'no reply'), ('ACA=2000', 'no reply')])
+
+    def test_lost_connection_single_command(self):
+        self.galil._g.GClose()
+        self.assertEqual(self.galil.commandBatch(['SPA=100']), [('SPA=100', 'no reply')])
+
+    def test_stale_marker(self):
+        self.galil.shutdown()
+        self.connect(_StaleMarker(axes='AB'))
+        self.sim.variables['tq'] = 50
+
+        errors = self.galil.commandBatch(['XXA', 'SPA=100', 'SPB=300'])
+        self.assertEqual(len(errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from modules.galil_wrapper import GalilController, GalilAxis
+from modules.simulator import SimulatedController
+
+try:
+    import numpy as np
+    from modules.capture import Capture
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class HomeCaptureTest(unittest.TestCase):
+
+    def setUp(self):
+        # 250 records of four fields, half a second at 500 Hz
+        self.max_elements = Capture._max_elements
+        Capture._max_elements = 1000
+
+        self.sim = SimulatedController(axes='A', limits=(-2000, 6000))
+        self.galil = GalilController(transport=self.sim.handle)
+        self.galil.open('sim')
+        self.axis = GalilAxis('A', self.galil)
+
+    def tearDown(self):
+        Capture._max_elements = self.max_elements
+        self.galil.shutdown()
+
+    def test_long_sweep(self):
+        # a quarter second to the left edge, a second to the right one
+        self.axis.home(8000, 5, capture=True)
+        self.assertTrue(self.galil.scheduler.waitIdle(self.axis, 10.0))
+
+        left = self.axis.home_captures['left'].data
+        right = self.axis.home_captures['right'].data
+        period = self.axis.home_captures['right'].period
+
+        # the short sweep did not fill the buffer
+        self.assertLess(len(left['time']), 250)
+        self.assertEqual(left['time'][0], 0)
+        self.assertAlmostEqual(left['position'][-1], -2000, delta=10)
+
+        # the long one wrapped, the latest records run up to the edge in order
+        self.assertEqual(len(right['time']), 250)
+        self.assertGreater(right['time'][0], 0.3)
+        np.testing.assert_allclose(np.diff(right['time']), period)
+        self.assertTrue((np.diff(right['position']) >= 0).all())
+        self.assertAlmostEqual(right['position'][-1], 8000, delta=10)
+        self.assertGreaterEqual(abs(right['torque'][-1]), 5)
+
+    def test_sized_from_travel(self):
+        self.assertEqual(Capture.samplesFor(('position', 'torque'), 0.1), 110)
+        self.assertEqual(Capture.samplesFor(('position', 'torque'), 10.0), 500)
+        self.assertEqual(Capture.samplesFor(('position', 'torque')), 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import unittest
+
+from modules.galil_wrapper import GalilController, GalilAxis
+from modules.program_compiler import compileProgram
+from modules.simulator import SimulatedController, SimulatedHandle
+
+try:
+    from modules.program_thread import CompiledProgramThread
+except ImportError:
+    CompiledProgramThread = None
+
+
+class _ProgramHandle(SimulatedHandle):
+
+    def GProgramDownload(self, program, preprocessor=''):
+        self.controller.program = program
+
+
+class _ProgramController(SimulatedController):
+
+    def __init__(self, *args, **kwargs):
+        '''Simulator that accepts programs and reports scripted row progress.'''
+        super(_ProgramController, self).__init__(*args, **kwargs)
+        self.program = None
+        self.script = []                # {variable: value} of each progress query
+        self.last = {}                  # {variable: value} set as the threads end
+
+    def handle(self):
+        return _ProgramHandle(self)
+
+    def _execute(self, command):
+        if command.startswith('XQ'):
+            return None
+        if command.startswith('MGrpc') and self.script:
+            self.variables.update(self.script.pop(0))
+        return super(_ProgramController, self)._execute(command)
+
+    def _operand(self, operand):
+        # recipe threads run while progress is left in the script
+        if operand.startswith('_XQ'):
+            if not self.script:
+                self.variables.update(self.last)
+            return self._message(0 if self.script else -1)
+        return super(_ProgramController, self)._operand(operand)
+
+
+class _Events(object):
+
+    def __init__(self):
+        self.rows = []
+
+    def event(self, axis, action, args=(), loop=0, row=0, timestamp=None):
+        self.rows.append(row)
+
+
+class _Stopper(_Events):
+
+    def __init__(self, thread):
+        '''Recorder stub that stops the thread on the first row.'''
+        super(_Stopper, self).__init__()
+        self.thread = thread
+
+    def event(self, *args, **kwargs):
+        super(_Stopper, self).event(*args, **kwargs)
+        self.thread.stop()
+
+
+class _ControllerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = _ProgramController(axes='AB')
+        self.galil = GalilController(transport=self.sim.handle)
+        self.galil.open('sim')
+        self.axes = dict((letter, GalilAxis(letter, self.galil)) for letter in 'AB')
+        for axis in self.axes.values():
+            axis.is_homed = True
+            axis.home_limit = 100.0
+
+    def tearDown(self):
+        self.galil.shutdown()
+
+
+class CompilerTest(_ControllerTest):
+
+    def source(self, program):
+        return compileProgram(self.axes, program)[self.galil][0].splitlines()
+
+    def test_progress_per_axis(self):
+        lines = self.source([{'time': 0, 'axis': 'A', 'action': 'Timed', 'args': [1, 10]},
+                             {'time': 5, 'axis': 'B', 'action': 'Timed', 'args': [1, 10]}])
+
+        self.assertIn('rpcA=0', lines)
+        self.assertIn('rpcB=1', lines)
+
+    def test_ping_pong_without_repeats(self):
+        lines = self.source([{'time': 0, 'axis': 'A', 'action': 'PingPong', 'args': [1, 50, 0]}])
+
+        self.assertNotIn('JS#PPA', lines)
+        self.assertFalse([line for line in lines if line.startswith('ppcA')])
+
+        lines = self.source([{'time': 0, 'axis': 'A', 'action': 'PingPong', 'args': [1, 50, 2]}])
+        self.assertIn('JS#PPA', lines)
+
+
+@unittest.skipIf(CompiledProgramThread is None, 'PyQt4 is not installed')
+class CompiledProgramThreadTest(_ControllerTest):
+
+    program = [{'time': 0, 'axis': 'A', 'action': 'Timed', 'args': [1, 10]},
+               {'time': 0, 'axis': 'B', 'action': 'Timed', 'args': [1, 10]},
+               {'time': 100, 'axis': 'A', 'action': 'Timed', 'args': [1, 10]},
+               {'time': 200, 'axis': 'B', 'action': 'Timed', 'args': [1, 10]}]
+
+    def thread(self):
+        thread = CompiledProgramThread(self.axes, self.program, 1)
+        thread._progress_rate = 0.001
+        return thread
+
+    def test_rows_recorded_when_their_axis_reaches_them(self):
+        # A runs ahead of B, rows of B are not dispatched with it
+        self.sim.script = [{'rpcA': 2, 'rpcB': -1}, {'rpcA': 2, 'rpcB': 1}, {'rpcA': 2, 'rpcB': 3}]
+
+        thread = self.thread()
+        thread.recorder = _Events()
+        thread.run()
+
+        self.assertEqual(thread.recorder.rows, [0, 2, 1, 3])
+
+    def test_rows_dispatched_as_threads_end(self):
+        # the last rows run between the progress and the completion query
+        self.sim.script = [{'rpcA': 0, 'rpcB': 1}]
+        self.sim.last = {'rpcA': 2, 'rpcB': 3}
+
+        thread = self.thread()
+        thread.recorder = _Events()
+        thread.run()
+
+        self.assertEqual(thread.recorder.rows, [0, 1, 2, 3])
+
+    def test_shadow_invalidated_after_run(self):
+        self.axes['A'].speed = 100
+        self.assertTrue(self.axes['A']._shadow)
+
+        self.thread().run()
+        self.assertFalse(self.axes['A']._shadow)
+        self.assertFalse(self.axes['B']._shadow)
+
+    def test_stop_sends_nothing(self):
+        thread = self.thread()
+        self.assertTrue(thread.compile())
+
+        commands = self.sim.commands
+        thread.stop()
+        self.assertEqual(self.sim.commands, commands)
+        self.assertFalse(thread.running)
+
+    def test_stopped_run_halts_threads(self):
+        self.sim.script = [{'rpcA': 0, 'rpcB': -1}] * 1000
+
+        thread = self.thread()
+        thread.recorder = _Stopper(thread)
+        self.axes['A'].speed = 100
+        thread.run()
+
+        self.assertTrue(self.sim.script)
+        self.assertEqual(thread.loop, 0)
+        self.assertFalse(self.axes['A']._shadow)
+
+
+if __name__ == '__main__':
+    unittest.main()
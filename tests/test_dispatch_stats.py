@@ -0,0 +1,56 @@
+import unittest
+
+from modules.dispatch_stats import DispatchStats
+
+
+class DispatchStatsTest(unittest.TestCase):
+
+    # ratio between two bin edges
+    _step = 10 ** 0.1
+
+    def test_empty(self):
+        stats = DispatchStats()
+        self.assertIsNone(stats.mean)
+        self.assertIsNone(stats.percentile(50))
+        self.assertEqual(stats.histogram(), [])
+
+    def test_percentiles(self):
+        stats = DispatchStats()
+        for i in range(1, 101):
+            stats.record(1.0, 1.0 + i * 1e-3, i)
+
+        self.assertEqual(stats.count, 100)
+        self.assertAlmostEqual(stats.mean, 0.0505)
+        self.assertAlmostEqual(stats.min, 0.001)
+        self.assertAlmostEqual(stats.max, 0.1)
+
+        # upper edges of the bins, at most one bin above the exact value
+        for p, exact in ((50, 0.05), (90, 0.09), (99, 0.099)):
+            value = stats.percentile(p)
+            self.assertGreaterEqual(value, exact)
+            self.assertLess(value, exact * self._step)
+
+        self.assertEqual(sum(count for edge, count in stats.histogram()), 100)
+
+    def test_outside_the_bins(self):
+        stats = DispatchStats()
+        stats.record(1.0, 0.5)
+        self.assertAlmostEqual(stats.percentile(50), 1e-5)
+
+        # later than the last edge reports the largest lateness
+        stats.record(0.0, 60.0)
+        self.assertEqual(stats.percentile(100), 60.0)
+        self.assertEqual(stats.summary()['max'], 60.0)
+
+    def test_recent_bounded(self):
+        stats = DispatchStats(history=10)
+        for i in range(100):
+            stats.record(i, i + 0.001, i)
+
+        self.assertEqual(len(stats.recent), 10)
+        self.assertEqual(stats.recent[-1][0], 99)
+        self.assertEqual(stats.count, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
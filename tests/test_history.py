@@ -0,0 +1,49 @@
+import unittest
+
+from modules.galil_wrapper import GalilController, GalilAxis
+from modules.simulator import SimulatedController
+from modules.telemetry import Snapshot
+
+try:
+    import numpy as np
+    from modules.history import TelemetryHistory
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class HistoryTest(unittest.TestCase):
+
+    def test_hour_of_stream(self):
+        galil = GalilController(transport=SimulatedController(axes='A').handle)
+        GalilAxis('A', galil)
+        self.assertTrue(galil.startHistory())
+        self.assertEqual(galil.history.capacity, 3600 * 100)
+        galil.shutdown()
+
+    def test_duration(self):
+        history = TelemetryHistory('A', ('position',), capacity=1000)
+        self.assertIsNone(history.duration())
+
+        for i in range(10):
+            history.append(Snapshot('A', ('position',), i * 0.01), timestamp=i * 0.01)
+        self.assertAlmostEqual(history.duration(), 10.0)
+
+        # full rings hold the same span
+        for i in range(10, 3000):
+            history.append(Snapshot('A', ('position',), i * 0.01), timestamp=i * 0.01)
+        self.assertAlmostEqual(history.duration(), 10.0)
+        self.assertAlmostEqual(history.window(60.0)[0][0], 20.0)
+
+    def test_exact_positions(self):
+        history = TelemetryHistory('A', ('position', 'torque'), capacity=10)
+        snapshot = Snapshot('A', ('position', 'torque'), 0.0)
+        snapshot.data['A'] = {'position': 2 ** 24 + 1, 'torque': 0.5}
+        history.append(snapshot)
+
+        self.assertEqual(history.series('A', 'position')[-1], 2 ** 24 + 1)
+        self.assertEqual(history.series('A', 'torque').dtype, np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from modules.io_service import IOService
+from modules.clock import monotonic
+
+
+class IOServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        # no controller is needed, the calls are plain functions
+        self.io = IOService(None)
+        self.calls = []
+
+    def tearDown(self):
+        self.io.stop()
+        if self.io.is_alive():
+            self.io.join(1.0)
+
+    def call(self, value):
+        self.calls.append((monotonic(), value))
+        return value
+
+    def test_latest_coalesces(self):
+        futures = [self.io.latest('speed', self.call, value) for value in (1, 2, 3)]
+        self.assertEqual(self.io.pending, 1)
+        self.assertEqual(self.io.coalesced, 2)
+
+        # every caller gets the newest value
+        self.io.start()
+        for future in futures:
+            self.assertEqual(future.result(1.0), 3)
+        self.assertEqual([value for t, value in self.calls], [3])
+
+    def test_latest_keys_are_separate(self):
+        first = self.io.latest('speed', self.call, 1)
+        second = self.io.latest('jog', self.call, 2)
+        self.assertEqual(self.io.pending, 2)
+
+        self.io.start()
+        self.assertEqual(first.result(1.0), 1)
+        self.assertEqual(second.result(1.0), 2)
+
+    def test_latest_throttled(self):
+        self.io.start()
+        self.io.latest('speed', self.call, 1).result(1.0)
+        self.io.latest('speed', self.call, 2).result(1.0)
+
+        # the second value waits out the period after the first
+        self.assertGreaterEqual(self.calls[1][0] - self.calls[0][0], self.io._latest_period * 0.99)
+
+    def test_writes_not_throttled(self):
+        self.io.start()
+        self.io.latest('speed', self.call, 1).result(1.0)
+        self.io.write(self.call, 2).result(1.0)
+        self.assertLess(self.calls[1][0] - self.calls[0][0], self.io._latest_period)
+
+    def test_read_shared(self):
+        first = self.io.read('position', self.call, 1)
+        second = self.io.read('position', self.call, 2)
+        self.assertIs(first, second)
+
+        self.io.start()
+        self.assertEqual(first.result(1.0), 1)
+        self.assertEqual(self.io.read('position', self.call, 3).result(1.0), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
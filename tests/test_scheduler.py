@@ -0,0 +1,106 @@
+from threading import Event
+import logging as log
+import unittest
+
+from modules.galil_wrapper import GalilController, GalilAxis
+from modules.scheduler import Poll, Notify
+from modules.simulator import SimulatedController
+from modules.futures import Future, Cancelled
+from modules.clock import monotonic
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = SimulatedController(axes='AB')
+        self.galil = GalilController(transport=self.sim.handle)
+        self.galil.open('sim')
+        self.scheduler = self.galil.scheduler
+        self.a = GalilAxis('A', self.galil)
+        self.b = GalilAxis('B', self.galil)
+
+        self.seen = []
+        self.started = Event()
+        self.gate = Event()
+
+    def tearDown(self):
+        self.gate.set()
+        self.galil.shutdown()
+
+    def block(self):
+        '''Task that holds the worker until the gate opens.'''
+        self.started.set()
+        self.gate.wait(2.0)
+
+    def test_order_per_axis(self):
+        self.scheduler.schedule(self.a, [(self.block,), (self.seen.append, 'A1'), (self.seen.append, 'A2')])
+        self.scheduler.schedule(self.b, [(self.seen.append, 'B0'), ('speed', 1000), (self.seen.append, 'B1')])
+        self.gate.set()
+
+        self.assertTrue(self.scheduler.waitIdle(self.a, 1.0))
+        self.assertTrue(self.scheduler.waitIdle(self.b, 1.0))
+
+        # queues keep their order, axes take turns
+        self.assertEqual(self.seen, ['B0', 'A1', 'A2', 'B1'])
+        self.assertEqual(self.b.speed, 1000)
+
+    def test_clear_during_task(self):
+        future = Future()
+        self.scheduler.schedule(self.a, [(self.block,), (self.seen.append, 'A1'), Notify(future)])
+        self.assertTrue(self.started.wait(1.0))
+
+        self.scheduler.clear(self.a)
+        self.assertTrue(self.scheduler.pending(self.a))
+        self.assertEqual(self.scheduler.tasks(self.a), [])
+        self.assertIsInstance(future.exception(0), Cancelled)
+
+        self.gate.set()
+        self.assertTrue(self.scheduler.waitIdle(self.a, 1.0))
+        self.assertFalse(self.scheduler.pending(self.a))
+        self.assertEqual(self.seen, [])
+
+    def test_wait_idle_timeout(self):
+        self.scheduler.schedule(self.a, [Poll(lambda: False)])
+
+        start = monotonic()
+        self.assertFalse(self.scheduler.waitIdle(self.a, 0.05))
+        self.assertGreaterEqual(monotonic() - start, 0.05)
+
+        self.scheduler.clear(self.a)
+        self.assertTrue(self.scheduler.waitIdle(self.a, 1.0))
+
+    def test_poll_timeout(self):
+        self.scheduler.schedule(self.a, [Poll(lambda: False, timeout=0.05), (self.seen.append, 'A1')])
+        self.assertTrue(self.scheduler.waitIdle(self.a, 1.0))
+        self.assertEqual(self.seen, ['A1'])
+
+    def test_parked_poll_runs_on_wake(self):
+        ready = []
+        self.scheduler.schedule(self.a, [Poll(lambda: bool(ready), interval=None), (self.seen.append, 'A1')])
+        self.assertFalse(self.scheduler.waitIdle(self.a, 0.05))
+
+        ready.append(True)
+        self.scheduler.wake()
+        self.assertTrue(self.scheduler.waitIdle(self.a, 1.0))
+        self.assertEqual(self.seen, ['A1'])
+
+    def test_failing_poll(self):
+        def fail():
+            raise RuntimeError('poll failed')
+
+        # a failed task is logged and dropped, the queue goes on
+        log.disable(log.ERROR)
+        try:
+            self.scheduler.schedule(self.a, [Poll(fail), (self.seen.append, 'A1')])
+            self.scheduler.schedule(self.b, [(self.seen.append, 'B0')])
+            self.assertTrue(self.scheduler.waitIdle(self.a, 1.0))
+            self.assertTrue(self.scheduler.waitIdle(self.b, 1.0))
+        finally:
+            log.disable(log.NOTSET)
+
+        self.assertEqual(sorted(self.seen), ['A1', 'B0'])
+        self.assertTrue(self.scheduler.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from modules.galil_wrapper import GalilController, GalilAxis
+from modules.simulator import SimulatedController
+
+
+class ShadowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = SimulatedController(axes='A')
+        self.galil = GalilController(transport=self.sim.handle)
+        self.galil.open('sim')
+        self.axis = GalilAxis('A', self.galil)
+
+    def tearDown(self):
+        self.galil.shutdown()
+
+    def drop(self):
+        '''Closes every connection the axis reads through.'''
+        self.galil._g.GClose()
+        self.galil._q.GClose()
+
+    def restore(self):
+        self.galil._g.GOpen('sim')
+        self.galil._q.GOpen('sim')
+
+    def test_failed_read_not_cached(self):
+        self.drop()
+        self.assertEqual(self.axis.acceleration, -1.0)
+        self.assertNotIn('AC', self.axis._shadow)
+
+        self.restore()
+        self.assertEqual(self.axis.acceleration, 256000)
+        self.assertEqual(self.axis._shadow['AC'], ' 256000')
+
+    def test_read_is_cached(self):
+        self.axis.speed
+        before = self.sim.commands
+        self.assertEqual(self.axis.speed, 25000)
+        self.assertEqual(self.sim.commands, before)
+
+    def test_failed_write_not_cached(self):
+        self.drop()
+        self.axis.speed = 1000
+        self.assertNotIn('SP', self.axis._shadow)
+
+    def test_write_invalidates_dependents(self):
+        self.axis.getData('PR')
+        self.axis.getData('PA')
+        self.assertIn('PR', self.axis._shadow)
+        self.assertIn('PA', self.axis._shadow)
+
+        # a jog replaces both targets
+        self.axis.jog = 5000
+        self.assertNotIn('PR', self.axis._shadow)
+        self.assertNotIn('PA', self.axis._shadow)
+        self.assertEqual(self.axis.jog, 5000)
+
+
+if __name__ == '__main__':
+    unittest.main()
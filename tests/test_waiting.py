@@ -0,0 +1,110 @@
+from threading import Thread
+import unittest
+import time
+
+from modules.galil_wrapper import GalilController, GalilAxis
+from modules.interrupts import MotionMonitor
+from modules.simulator import SimulatedController
+from modules.clock import monotonic
+
+
+class _SilentMonitor(object):
+    '''Stands in for a MotionMonitor whose interrupts never arrive.'''
+
+    def stop(self):
+        pass
+
+    def is_alive(self):
+        return False
+
+
+class _FailingMonitor(MotionMonitor):
+    '''MotionMonitor whose listener dies of an unexpected error.'''
+
+    def listen(self):
+        self._stopping.wait(0.05)
+        raise RuntimeError('listener failed')
+
+
+class WaitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = SimulatedController(axes='A')
+        self.galil = GalilController(transport=self.sim.handle)
+        self.galil.open('sim')
+        self.axis = GalilAxis('A', self.galil)
+
+    def tearDown(self):
+        self.galil.shutdown()
+
+    def move(self, duration):
+        '''Begins a constant speed move of about duration seconds.'''
+        self.axis.acceleration = self.axis.deceleration = 100000000
+        self.axis.speed = 100000
+        self.axis.position_relative = int(100000 * duration)
+        self.axis.enable()
+        self.axis.begin()
+
+    def test_wait_on_interrupt(self):
+        self.galil.startMonitor()
+        time.sleep(0.1)
+
+        for i in range(3):
+            start = monotonic()
+            self.move(0.1)
+            self.axis.wait()
+            self.assertFalse(self.axis.wait(blocking=False))
+            self.assertLess(monotonic() - start, 0.15)
+
+    def test_wait_task_on_interrupt(self):
+        self.galil.startMonitor()
+        time.sleep(0.1)
+
+        start = monotonic()
+        self.move(0.1)
+        self.axis.wait_async().result(2.0)
+        self.assertFalse(self.axis.wait(blocking=False))
+        self.assertLess(monotonic() - start, 0.15)
+
+    def test_wait_task_waits_for_wake(self):
+        self.galil.monitor = _SilentMonitor()
+        self.move(0.05)
+        future = self.axis.wait_async()
+
+        time.sleep(0.2)
+        self.assertFalse(future.done())
+
+        # a missed interrupt is caught when the monitor checks again
+        self.galil.motionComplete()
+        future.result(1.0)
+
+    def test_wait_after_monitor_stops(self):
+        self.galil.startMonitor()
+        time.sleep(0.1)
+        self.move(0.3)
+
+        waiter = Thread(target=self.axis.wait)
+        waiter.start()
+        time.sleep(0.05)
+        self.galil.stopMonitor()
+
+        # polls once the listener has gone
+        waiter.join(2.0)
+        self.assertFalse(waiter.is_alive())
+
+    def test_wait_after_monitor_fails(self):
+        self.galil.monitor = _FailingMonitor(self.galil)
+        self.galil.monitor.start()
+        self.move(0.3)
+
+        waiter = Thread(target=self.axis.wait)
+        waiter.start()
+
+        # the failed listener hands waits back to polling
+        waiter.join(2.0)
+        self.assertFalse(waiter.is_alive())
+        self.assertIsNone(self.galil.monitor)
+
+
+if __name__ == '__main__':
+    unittest.main()
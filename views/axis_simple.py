@@ -1,10 +1,13 @@
 from PyQt4 import QtCore
+from modules.futures import background
+from .delivery import Delivery
 from . import View
 
 
 class AxisSimple(View['AxisSimple']):
 
     _refresh_rate = 500
+    _plot_rate = 100
 
     def __init__(self, axis, name, parent=None):
         super(AxisSimple, self).__init__(parent)
@@ -13,6 +16,14 @@ class AxisSimple(View['AxisSimple']):
         # controller
         self._axis = axis
 
+        # controller I/O runs off the GUI thread, results come back through delivery
+        self._io = axis.controller.io
+        self._delivery = Delivery(self)
+        self._reading = None
+
+        # direction of the last jog, speed edits keep it without reading JG
+        self._jog_direction = 1
+
         # set name
         self.name = name
         self.mainBox.setTitle(self.name)
@@ -30,18 +41,24 @@ class AxisSimple(View['AxisSimple']):
         self.jogSpeedSpinBox.valueChanged.connect(self.setJogSpeed)
 
         # configuration
-        self.accelerationSpinBox.valueChanged.connect(lambda v: self._axis.__setattr__('acceleration', v))
-        self.decelerationSpinBox.valueChanged.connect(lambda v: self._axis.__setattr__('deceleration', v))
-        self.torqueLimitSpinBox.valueChanged.connect(lambda v: self._axis.__setattr__('torque_limit', v))
+        # a spin box drag sends only the newest value, a few times per second
+        self.accelerationSpinBox.valueChanged.connect(lambda v: self.setParameter('acceleration', v))
+        self.decelerationSpinBox.valueChanged.connect(lambda v: self.setParameter('deceleration', v))
+        self.torqueLimitSpinBox.valueChanged.connect(lambda v: self.setParameter('torque_limit', v))
         self.convFactorSpinBox.valueChanged.connect(lambda v: self._axis.__setattr__('conversion_factor', v))
 
         # stop
-        self.stopButton.clicked.connect(self._axis.cancel)
+        self.stopButton.clicked.connect(lambda x: background(self._axis.cancel))
 
         # data polling
         self._autoRefresh = QtCore.QTimer(self)
         self._autoRefresh.timeout.connect(self.refresh)
 
+        # plot redraws read the history only, no controller I/O
+        self.plot.setSource(axis.controller, axis.axis)
+        self._plotRefresh = QtCore.QTimer(self)
+        self._plotRefresh.timeout.connect(self.plot.update)
+
         # tool box changed
         self.toolBox.currentChanged.connect(self.toolBoxChanged)
         self.toolBoxChanged(False)
@@ -72,28 +89,40 @@ class AxisSimple(View['AxisSimple']):
 
     def toolBoxChanged(self, index):
         if self.toolBox.currentWidget() is self.configurationWidget:
-            self.accelerationSpinBox.setValue(int(self._axis.acceleration))
-            self.decelerationSpinBox.setValue(int(self._axis.deceleration))
-            self.torqueLimitSpinBox.setValue(float(self._axis.torque_limit))
+            for spinBox, name, cast in [(self.accelerationSpinBox, 'acceleration', int),
+                                        (self.decelerationSpinBox, 'deceleration', int),
+                                        (self.torqueLimitSpinBox, 'torque_limit', float)]:
+                future = self._io.read((self._axis.axis, name), getattr, self._axis, name)
+                self._delivery.then(future, lambda v, s=spinBox, c=cast: s.setValue(c(v)))
+
             self.convFactorSpinBox.setValue(float(self._axis.conversion_factor))
 
     def showEvent(self, event):
         super(AxisSimple, self).showEvent(event)
         self._autoRefresh.start(self._refresh_rate)
+        self._plotRefresh.start(self._plot_rate)
 
     def hideEvent(self, event):
         super(AxisSimple, self).hideEvent(event)
         self._autoRefresh.stop()
+        self._plotRefresh.stop()
 
     def refresh(self):
         '''Updates all views with data from controller.'''
         # information
         if self._axis.controller.connected is True:
             if self.toolBox.currentWidget() is self.informationWidget:
-                self.positionEdit.setText(str(self._axis.position))
-                self.velocityEdit.setText(str(self._axis.velocity))
-                self.torqueEdit.setText(str(self._axis.torque))
-                self.errorEdit.setText(str(self._axis.error))
+                # skip the tick while the last read is in flight
+                if self._reading is not None and not self._reading.done():
+                    return
+
+                # views on the same controller share one snapshot per tick
+                self._reading = self._io.read((self._axis.axis, 'telemetry'), self._axis.telemetry,
+                                              self._refresh_rate / 2000.0)
+                self._delivery.then(self._reading, self.showTelemetry)
+
+    def showTelemetry(self, data):
+        self.plot.setLatest(data)
 
     def timed(self, direction='+'):
         '''Moves for a specified time at speed.'''
@@ -108,15 +137,14 @@ class AxisSimple(View['AxisSimple']):
     def jog(self, direction='+'):
         '''Moves indefinitely at jog speed.'''
         jog_speed = float(self.jogSpeedSpinBox.value())
+        self._jog_direction = -1 if direction == '-' else 1
 
-        if direction == '-':
-            jog_speed *= -1
-
-        self._axis.jogMove(jog_speed)
+        self._axis.jogMove(jog_speed * self._jog_direction)
 
     def setJogSpeed(self, speed):
         '''Sets new jog speed on the fly.'''
-        if self._axis.jog >= 0:
-            self._axis.jog = speed
-        else:
-            self._axis.jog = (speed * -1)
+        self.setParameter('jog', speed * self._jog_direction)
+
+    def setParameter(self, name, value):
+        '''Writes an axis property, pending writes of the same property are replaced.'''
+        self._io.latest((self._axis.axis, name), setattr, self._axis, name, value)
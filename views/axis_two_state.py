@@ -1,5 +1,7 @@
 from PyQt4 import QtCore
 from threading import Thread
+from modules.futures import background
+from .delivery import Delivery
 from . import View
 import time
 
@@ -7,6 +9,7 @@ import time
 class AxisTwoState(View['AxisTwoState']):
 
     _refresh_rate = 500
+    _plot_rate = 100
 
     def __init__(self, axis, name, parent=None):
         super(AxisTwoState, self).__init__(parent)
@@ -15,6 +18,11 @@ class AxisTwoState(View['AxisTwoState']):
         # controller
         self._axis = axis
 
+        # controller I/O runs off the GUI thread, results come back through delivery
+        self._io = axis.controller.io
+        self._delivery = Delivery(self)
+        self._reading = None
+
         # set name
         self.name = name
         self.mainBox.setTitle(self.name)
@@ -34,12 +42,17 @@ class AxisTwoState(View['AxisTwoState']):
         self.limitSpinBox.valueChanged.connect(lambda v: self._axis.__setattr__('home_limit', v))
 
         # stop
-        self.stopButton.clicked.connect(self._axis.cancel)
+        self.stopButton.clicked.connect(lambda x: background(self._axis.cancel))
 
         # data polling
         self._autoRefresh = QtCore.QTimer(self)
         self._autoRefresh.timeout.connect(self.refresh)
 
+        # plot redraws read the history only, no controller I/O
+        self.plot.setSource(axis.controller, axis.axis)
+        self._plotRefresh = QtCore.QTimer(self)
+        self._plotRefresh.timeout.connect(self.plot.update)
+
         # tool box changed
         self.toolBox.currentChanged.connect(self.toolBoxChanged)
         self.toolBoxChanged(False)
@@ -80,20 +93,29 @@ class AxisTwoState(View['AxisTwoState']):
     def showEvent(self, event):
         super(AxisTwoState, self).showEvent(event)
         self._autoRefresh.start(self._refresh_rate)
+        self._plotRefresh.start(self._plot_rate)
 
     def hideEvent(self, event):
         super(AxisTwoState, self).hideEvent(event)
         self._autoRefresh.stop()
+        self._plotRefresh.stop()
 
     def refresh(self):
         '''Updates all views with data from controller.'''
         # information
         if self._axis.controller.connected is True:
             if self.toolBox.currentWidget() is self.informationWidget:
-                self.positionEdit.setText(str(self._axis.position))
-                self.velocityEdit.setText(str(self._axis.velocity))
-                self.torqueEdit.setText(str(self._axis.torque))
-                self.errorEdit.setText(str(self._axis.error))
+                # skip the tick while the last read is in flight
+                if self._reading is not None and not self._reading.done():
+                    return
+
+                # views on the same controller share one snapshot per tick
+                self._reading = self._io.read((self._axis.axis, 'telemetry'), self._axis.telemetry,
+                                              self._refresh_rate / 2000.0)
+                self._delivery.then(self._reading, self.showTelemetry)
+
+    def showTelemetry(self, data):
+        self.plot.setLatest(data)
 
     def home(self):
         '''Finds the edges of the axis, then sets the center.'''
@@ -4,6 +4,13 @@ from . import View
 
 class ConnectionTab(View['ConnectionTab']):
 
+    # connection steps are reported from background threads
+    progress = QtCore.pyqtSignal(int, str)
+    finished = QtCore.pyqtSignal(int, bool)
+
+    # seconds before an unreachable controller gives up
+    _timeout = 3.0
+
     def __init__(self, controllers, parent=None):
         super(ConnectionTab, self).__init__(parent)
         self.setupUi(self)
@@ -22,6 +29,12 @@ class ConnectionTab(View['ConnectionTab']):
         # connect signals
         self.connect_btn[0].clicked.connect(lambda v, i=0: self.connect(i))
         self.connect_btn[1].clicked.connect(lambda v, i=1: self.connect(i))
+        self.connectAllButton.clicked.connect(self.connectAll)
+        self.progress.connect(self.connectionProgress)
+        self.finished.connect(self.connectionFinished)
+
+        # controllers with a connection attempt in flight
+        self.connecting = set()
 
         # settings
         self.readSettings()
@@ -53,19 +66,34 @@ class ConnectionTab(View['ConnectionTab']):
     def connect(self, id):
         name = ['Galil 0', 'Galil 1'][id]
 
+        if id in self.connecting:
+            return
+
         if self.controllers[name].connected:
             # disconnect
             self.controllers[name].close()
             self.connect_btn[id].setText('Connect')
 
         else:
-            # connect
-            self.connect_btn[id].setDown(True)
-
-            if self.controllers[name].open(self.getIP(self.ip[id])):
-                self.controllers[name].disable()
-                self.connect_btn[id].setText('Disconnect')
-            else:
-                self.connect_btn[id].setText('Connect')
-
-            self.connect_btn[id].setDown(False)
+            # connect and set up in the background, the window stays responsive
+            self.connecting.add(id)
+            self.connect_btn[id].setEnabled(False)
+
+            future = self.controllers[name].openAsync(
+                self.getIP(self.ip[id]), timeout=self._timeout,
+                progress=lambda step, i=id: self.progress.emit(i, step))
+            future.add_done_callback(lambda f, i=id: self.finished.emit(i, f.exception() is None and f.result()))
+
+    def connectAll(self):
+        '''Connects every controller that is not connected, all at once.'''
+        for id, name in enumerate(['Galil 0', 'Galil 1']):
+            if not self.controllers[name].connected:
+                self.connect(id)
+
+    def connectionProgress(self, id, step):
+        self.connect_btn[id].setText('{}...'.format(step))
+
+    def connectionFinished(self, id, connected):
+        self.connecting.discard(id)
+        self.connect_btn[id].setEnabled(True)
+        self.connect_btn[id].setText('Disconnect' if connected else 'Connect')
@@ -0,0 +1,21 @@
+from PyQt4 import QtCore
+
+
+class Delivery(QtCore.QObject):
+    '''Calls back with the results of futures on the thread that created it.'''
+
+    _deliver = QtCore.pyqtSignal(object, object)
+
+    def __init__(self, parent=None):
+        super(Delivery, self).__init__(parent)
+        self._deliver.connect(self._call)
+
+    def then(self, future, callback):
+        '''Calls callback(result) on the GUI thread once future succeeds.'''
+        future.add_done_callback(lambda f: self._deliver.emit(callback, f))
+        return future
+
+    def _call(self, callback, future):
+        # failures were logged where they happened
+        if future.exception(0) is None:
+            callback(future.result(0))
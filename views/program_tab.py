@@ -1,17 +1,25 @@
 from PyQt4 import QtGui, uic
 from models import ProgramTableModel
-from modules import ProgramThread
+from modules import ProgramThread, CompiledProgramThread, RunRecorder
+from modules.futures import background
 from . import View
+import logging as log
+import time
+import os
 
 
 class ProgramTab(View['ProgramTab']):
 
-    def __init__(self, axes, parent=None):
+    def __init__(self, axes, parent=None, recordings=None):
         super(ProgramTab, self).__init__(parent)
         self.setupUi(self)
 
         self.axes = axes
 
+        # runs are recorded to a new directory here when set
+        self.recordings = recordings
+        self.recorder = None
+
         self.model = ProgramTableModel(axes)
 
         self.tableView.setModel(self.model)
@@ -68,14 +76,35 @@ class ProgramTab(View['ProgramTab']):
 
     def run(self):
         loops = self.loopSpinBox.value()
-        self.worker = ProgramThread(self.axes, self.model.program, loops, self)
+        if self.controllerCheckBox.isChecked():
+            self.worker = CompiledProgramThread(self.axes, self.model.program, loops, self)
+        else:
+            self.worker = ProgramThread(self.axes, self.model.program, loops, self)
         self.worker.started.connect(self.programStarted)
         self.worker.instruction_changed.connect(self.highlightInstruction)
         self.worker.iteration_changed.connect(self.loopSpinBox.setValue)
         self.worker.finished.connect(self.programFinished)
         self.worker.finished.connect(self.worker.deleteLater)
+        self.worker.recorder = self.record()
         self.worker.start()
 
+    def record(self):
+        '''Starts recording a run, returns the recorder or None.'''
+        if not self.recordings:
+            return None
+
+        path = os.path.join(self.recordings, time.strftime('run-%Y%m%d-%H%M%S'))
+        try:
+            self.recorder = RunRecorder(path)
+        except (RuntimeError, OSError) as e:
+            log.warning('Run is not recorded: {}'.format(e))
+            return None
+
+        self.recorder.attach(self.axes)
+        self.recorder.start()
+        log.info('Recording run to {}'.format(path))
+        return self.recorder
+
     def stop(self):
         if self.worker:
             self.worker.stop()
@@ -89,5 +118,10 @@ class ProgramTab(View['ProgramTab']):
         self.runButton.setEnabled(True)
         self.worker = None
 
+        # the last chunks are written off the GUI thread
+        if self.recorder is not None:
+            background(self.recorder.close)
+            self.recorder = None
+
     def highlightInstruction(self, row):
         self.tableView.selectRow(row)
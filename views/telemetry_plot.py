@@ -0,0 +1,109 @@
+from PyQt4 import QtCore, QtGui
+from modules.decimate import minmax
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TelemetryPlot(QtGui.QWidget):
+    '''Draws the recent telemetry history of one axis, one lane per field.'''
+
+    # seconds of history on screen, the wheel zooms out up to all of the history
+    _span = 60.0
+    _min_span = 1.0
+
+    # field, label, pen colour
+    _traces = (('position', 'Position', QtCore.Qt.darkBlue),
+               ('velocity', 'Velocity', QtCore.Qt.darkGreen),
+               ('torque', 'Torque', QtCore.Qt.darkRed))
+
+    def __init__(self, parent=None):
+        super(TelemetryPlot, self).__init__(parent)
+        self.setSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
+
+        self._controller = None
+        self._axis = None
+        self._latest = {}
+
+    def setSource(self, controller, axis):
+        '''Plots axis from the history of controller, which may start or stop later.'''
+        self._controller = controller
+        self._axis = axis
+        self.update()
+
+    def setSpan(self, seconds):
+        '''Shows the last seconds of history, at most what the history can hold.'''
+        history = getattr(self._controller, 'history', None)
+        longest = history.duration() if history is not None else None
+        self._span = max(self._min_span, min(seconds, longest or seconds))
+        self.update()
+
+    def wheelEvent(self, event):
+        # each notch halves or doubles the span
+        self.setSpan(self._span * (0.5 if event.delta() > 0 else 2.0))
+
+    def setLatest(self, data):
+        '''Shows the values of a telemetry read next to the traces.'''
+        self._latest = data
+        self.update()
+
+    def _window(self):
+        '''Returns (times, {field: values}) to draw, None without history.'''
+        history = getattr(self._controller, 'history', None)
+        if history is None or np is None or not len(history):
+            return None
+
+        fields = [field for field, label, colour in self._traces if field in history.fields]
+        times, data = history.window(self._span, fields, self._axis)
+        return times, dict((field, data[(self._axis.upper(), field)]) for field in fields)
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+
+        width = self.width()
+        lane = self.height() / float(len(self._traces))
+        window = self._window()
+
+        for row, (field, label, colour) in enumerate(self._traces):
+            top = row * lane
+            latest = self._latest.get(field)
+
+            if window is not None and field in window[1]:
+                # at most two points per pixel column, whatever the sample rate
+                times, values = minmax(window[0], window[1][field], width)
+                finite = np.isfinite(values)
+                times, values = times[finite], values[finite]
+
+                if len(values):
+                    if latest is None:
+                        latest = values[-1]
+
+                    # each lane scales to its own range, flat traces sit in the middle
+                    low, high = float(values.min()), float(values.max())
+                    if high > low:
+                        y = top + lane - 2 - (values - low) * ((lane - 4) / (high - low))
+                    else:
+                        y = np.full(len(values), top + lane / 2.0)
+
+                    # newest sample at the right edge
+                    x = width - 1 - (times[-1] - times) * (width / self._span)
+
+                    painter.setPen(QtGui.QPen(colour))
+                    painter.drawPolyline(QtGui.QPolygonF([QtCore.QPointF(a, b) for a, b in zip(x, y)]))
+
+            painter.setPen(QtGui.QPen(colour))
+            text = label if latest is None else '{} {:g}'.format(label, float(latest))
+            painter.drawText(QtCore.QRectF(4, top, width - 8, lane), QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop, text)
+
+            if row:
+                painter.setPen(QtGui.QPen(self.palette().mid().color()))
+                painter.drawLine(QtCore.QPointF(0, top), QtCore.QPointF(width, top))
+            else:
+                painter.setPen(QtGui.QPen(self.palette().mid().color()))
+                painter.drawText(QtCore.QRectF(4, top, width - 8, lane), QtCore.Qt.AlignRight | QtCore.Qt.AlignTop,
+                                 '{:g} s'.format(self._span))
+
+        painter.end()